@@ -1,5 +1,6 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file
-from supabase.client import create_client, Client
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file, Response, Request, g, has_request_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from supabase.client import create_client, Client, ClientOptions
 import os
 from dotenv import load_dotenv
 from datetime import datetime, date, timezone, timedelta
@@ -7,10 +8,25 @@ import uuid
 from typing import Optional
 import logging
 import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
 import tempfile
-import pandas as pd
+import io
+import json
+import base64
+import hashlib
+import httpx
+import functools
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from storage import Repository, create_repository
+from excel_engine import (
+    MEECHUL_ENGINES, MISSING_RESPONSE_TYPES, ExcelReadError, open_upload, detect_upload_format,
+    init_excel_process, run_excel_task, sort_meechul_to_file, sort_meechul_diff_to_file,
+    sort_missing_response_to_file, read_missing_response_meta, read_missing_response_page,
+    missing_response_offset, write_missing_response_workbook
+)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -27,206 +43,151 @@ def get_korean_datetime():
     """한국 시간 기준으로 현재 시간을 반환"""
     return datetime.now(KST)
 
-def process_excel_p3(file_path):
-    """P3 정렬 처리 (중복 제거 포함)"""
-    logger.info(f"P3 처리 시작: {file_path}")
-    
-    wb = openpyxl.load_workbook(file_path)
-    ws = wb.active
-    last_row = ws.max_row
-    last_col = ws.max_column
-    
-    logger.info(f"Excel 파일 크기: {last_row}행 x {last_col}열")
-
-    p1p2_dict = {}
-    p3_dict = {}
-
-    for i in range(3, last_row + 1):
-        b = str(ws.cell(i, 2).value)
-        type_code = str(ws.cell(i, 15).value)
-        if type_code.startswith("P1") or type_code.startswith("P2"):
-            p1p2_dict[b] = True
-        elif type_code.startswith("P3"):
-            p3_dict.setdefault(b, []).append(i)
-
-    logger.info(f"P1/P2 항목 수: {len(p1p2_dict)}, P3 항목 수: {len(p3_dict)}")
-
-    filtered = {k: v for k, v in p3_dict.items() if k not in p1p2_dict}
-    logger.info(f"중복 제거 후 P3 항목 수: {len(filtered)}")
-
-    group_array = []
-    for key, rows in filtered.items():
-        기준문자 = str(ws.cell(rows[0], 15).value)[2:3]
-        group_array.append((key, 기준문자, rows))
-    group_array.sort(key=lambda x: x[1])
-    
-    logger.info(f"정렬된 그룹 수: {len(group_array)}")
-
-    new_wb = openpyxl.Workbook()
-    result_ws = new_wb.active
-    result_ws.title = "정렬결과"
-
-    result_row = 3
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    red_bold = Font(color="FF0000", bold=True)
-    center_align = Alignment(horizontal="center", vertical="center")
-
-    for key, 기준문자, rows in group_array:
-        m_high = any(ws.cell(i, 13).value not in [None, 0, ''] for i in rows)
-        n_high = any(ws.cell(i, 14).value not in [None, 0, ''] for i in rows)
-        start = result_row
-
-        for i in rows:
-            for c in range(1, last_col + 1):
-                value = ws.cell(i, c).value
-                result_ws.cell(result_row, c).value = value
-                result_ws.cell(result_row, c).alignment = center_align
-            if len(rows) > 1:
-                result_ws.cell(result_row, 2).fill = PatternFill(start_color="FFC0CB", end_color="FFC0CB", fill_type="solid")
-            result_row += 1
-
-        if m_high:
-            for r in range(start, result_row):
-                cell = result_ws.cell(r, 13)
-                cell.fill = yellow_fill
-                cell.font = red_bold
-                cell.alignment = center_align
-
-        if n_high:
-            for r in range(start, result_row):
-                cell = result_ws.cell(r, 14)
-                cell.fill = yellow_fill
-                cell.font = red_bold
-                cell.alignment = center_align
-
-        def merge_same(col):
-            val = result_ws.cell(start, col).value
-            if all(result_ws.cell(r, col).value == val for r in range(start, result_row)):
-                result_ws.merge_cells(start_row=start, start_column=col, end_row=result_row - 1, end_column=col)
-                result_ws.cell(start, col).alignment = center_align
-
-        merge_same(13)
-        merge_same(14)
-
-    for r in range(1, 3):
-        for c in range(1, last_col + 1):
-            value = ws.cell(r, c).value
-            result_ws.cell(r, c).value = value
-            result_ws.cell(r, c).alignment = center_align
-
-    for col in range(1, last_col + 1):
-        max_len = max(len(str(result_ws.cell(r, col).value or "")) for r in range(1, result_ws.max_row + 1))
-        result_ws.column_dimensions[get_column_letter(col)].width = max_len + 2
-
-    return new_wb
-
-def process_excel_general(file_path, 기준코드):
-    """일반 정렬 처리 (P1, P2 등)"""
-    logger.info(f"{기준코드} 처리 시작: {file_path}")
-    
-    wb = openpyxl.load_workbook(file_path)
-    ws = wb.active
-    last_row = ws.max_row
-    last_col = ws.max_column
-    
-    logger.info(f"Excel 파일 크기: {last_row}행 x {last_col}열")
-
-    group_dict = {}
-    for i in range(3, last_row + 1):
-        code = str(ws.cell(i, 15).value)
-        if code.startswith(기준코드):
-            key = str(ws.cell(i, 2).value)
-            group_dict.setdefault(key, []).append(i)
-
-    logger.info(f"{기준코드} 항목 수: {len(group_dict)}")
-
-    group_array = []
-    for key, rows in group_dict.items():
-        기준문자 = str(ws.cell(rows[0], 15).value)[2:3]
-        group_array.append((key, 기준문자, rows))
-    group_array.sort(key=lambda x: x[1])
-    
-    logger.info(f"정렬된 그룹 수: {len(group_array)}")
-
-    new_wb = openpyxl.Workbook()
-    result_ws = new_wb.active
-    result_ws.title = "정렬결과"
-
-    result_row = 3
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    red_bold = Font(color="FF0000", bold=True)
-    center_align = Alignment(horizontal="center", vertical="center")
-    pink_fill = PatternFill(start_color="FFC0CB", end_color="FFC0CB", fill_type="solid")
-
-    for _, _, rows in group_array:
-        start = result_row
-        m_high = any(ws.cell(i, 13).value not in [None, 0, ''] for i in rows)
-        n_high = any(ws.cell(i, 14).value not in [None, 0, ''] for i in rows)
-
-        for i in rows:
-            for c in range(1, last_col + 1):
-                result_ws.cell(result_row, c).value = ws.cell(i, c).value
-                result_ws.cell(result_row, c).alignment = center_align
-            if len(rows) > 1:
-                result_ws.cell(result_row, 2).fill = pink_fill
-            result_row += 1
-
-        if m_high:
-            for r in range(start, result_row):
-                cell = result_ws.cell(r, 13)
-                cell.fill = yellow_fill
-                cell.font = red_bold
-                cell.alignment = center_align
-
-        if n_high:
-            for r in range(start, result_row):
-                cell = result_ws.cell(r, 14)
-                cell.fill = yellow_fill
-                cell.font = red_bold
-                cell.alignment = center_align
-
-        def merge_same(col):
-            val = result_ws.cell(start, col).value
-            if all(result_ws.cell(r, col).value == val for r in range(start, result_row)):
-                result_ws.merge_cells(start_row=start, start_column=col, end_row=result_row - 1, end_column=col)
-                result_ws.cell(start, col).alignment = center_align
-
-        merge_same(13)
-        merge_same(14)
-
-    for r in range(1, 3):
-        for c in range(1, last_col + 1):
-            result_ws.cell(r, c).value = ws.cell(r, c).value
-            result_ws.cell(r, c).alignment = center_align
-
-    for col in range(1, last_col + 1):
-        max_len = max(len(str(result_ws.cell(r, col).value or "")) for r in range(1, result_ws.max_row + 1))
-        result_ws.column_dimensions[get_column_letter(col)].width = max_len + 2
-
-    return new_wb
+# 업로드 최대 크기 (요청 본문을 받기 전에 Content-Length로 거부)와 메모리에 받을 최대 크기 (넘으면 임시 파일로 옮김)
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_MB', '50')) * 1024 * 1024
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_MB', '4')) * 1024 * 1024
+UPLOAD_SPILL_PREFIX = 'upload_'
+
+class UploadSpool:
+    """업로드 파일을 메모리에 받다가 UPLOAD_SPOOL_BYTES를 넘으면 고유 이름의 임시 파일로 옮겨 받는 버퍼
+
+    임시 파일로 옮겨진 경우 take()로 경로를 넘겨받은 쪽이 삭제를 맡고,
+    넘겨받지 않은 채 요청이 끝나면(close) 바로 삭제한다.
+    """
+
+    def __init__(self, max_size=UPLOAD_SPOOL_BYTES):
+        self.max_size = max_size
+        self.file = io.BytesIO()
+        self.path = None
+        self.taken = False
+
+    def write(self, data):
+        if self.path is None and self.file.tell() + len(data) > self.max_size:
+            fd, self.path = tempfile.mkstemp(prefix=UPLOAD_SPILL_PREFIX)
+            spilled = os.fdopen(fd, 'w+b')
+            spilled.write(self.file.getvalue())
+            self.file = spilled
+        return self.file.write(data)
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def readline(self, size=-1):
+        return self.file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def take(self):
+        """처리 함수에 넘길 업로드 내용 반환 (메모리에 받았으면 bytes, 임시 파일로 옮겼으면 그 경로)"""
+        if self.path is None:
+            return self.file.getvalue()
+        self.file.flush()
+        self.taken = True
+        return self.path
+
+    def close(self):
+        self.file.close()
+        if self.path is not None and not self.taken and os.path.exists(self.path):
+            os.unlink(self.path)
+
+def take_upload(file):
+    """요청의 업로드 파일을 디스크에 다시 쓰지 않고 bytes 또는 임시 파일 경로로 꺼냄"""
+    if isinstance(file.stream, UploadSpool):
+        upload = file.stream.take()
+        if isinstance(upload, str):
+            # 처리 도중 워커가 죽어 남은 임시 파일은 결과 파일 정리 스레드가 보관 기간이 지나면 삭제
+            start_meechul_sweeper()
+        return upload
+    return file.read()
+
+def discard_upload(file_path):
+    """처리가 끝난 업로드의 임시 파일 삭제 (메모리에 받은 업로드는 정리할 파일 없음)"""
+    if isinstance(file_path, str) and os.path.exists(file_path):
+        os.unlink(file_path)
 
 # 환경 변수 로드 (로컬 개발용)
 if os.path.exists('.env'):
     load_dotenv()
 
+class UploadRequest(Request):
+    """업로드 파일을 UploadSpool로 받는 요청 클래스 (기본은 500KB 초과 시 익명 임시 파일)"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool()
+
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES
+
+# Supabase(PostgREST) 호출 계층: keep-alive 연결 풀을 공유하는 HTTP 클라이언트, 요청별 호출 수/지연 시간 기록
+SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '10'))
+SUPABASE_TIMEOUT = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10'))
+SUPABASE_SLOW_REQUEST_MS = int(os.getenv('SUPABASE_SLOW_REQUEST_MS', '500'))
+
+supabase_route_stats = {}
+supabase_stats_lock = threading.Lock()
 
-# Supabase 클라이언트 설정
+class TimedHttpClient(httpx.Client):
+    """Supabase 호출마다 응답 본문까지 받는 데 걸린 시간을 현재 요청의 호출 기록에 더하는 httpx 클라이언트"""
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            record_supabase_call(time.perf_counter() - start)
+
+def record_supabase_call(seconds):
+    """Flask 요청 처리 중 호출이면 요청별 호출 수와 누적 시간에 더함 (백그라운드 작업 스레드 호출은 제외)"""
+    if has_request_context():
+        g.supabase_calls = g.get('supabase_calls', 0) + 1
+        g.supabase_ms = g.get('supabase_ms', 0.0) + seconds * 1000
+
+def create_supabase_http_client():
+    """프로세스에서 공유하는 Supabase HTTP 클라이언트 (연결 수 상한, keep-alive 재사용, 연결/응답 시간 제한)"""
+    return TimedHttpClient(
+        limits=httpx.Limits(max_connections=SUPABASE_POOL_SIZE,
+                            max_keepalive_connections=SUPABASE_POOL_SIZE,
+                            keepalive_expiry=30),
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=5.0),
+        follow_redirects=True
+    )
+
+# 저장소(users, departments, work_logs): 기본은 Supabase(PostgREST HTTP API),
+# postgres는 연결 풀로 Postgres에 직접 SQL, sqlite는 로컬 파일 (WAL 모드)
+DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'supabase')
+DATABASE_URL = os.getenv('DATABASE_URL')
+DATABASE_POOL_MIN = int(os.getenv('DATABASE_POOL_MIN', '1'))
+DATABASE_POOL_MAX = int(os.getenv('DATABASE_POOL_MAX', '10'))
+DATABASE_TIMEOUT = float(os.getenv('DATABASE_TIMEOUT_SECONDS', '10'))
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'worktracker.db')
+
+# Supabase 클라이언트 설정 (Supabase 저장소를 쓸 때만)
 supabase: Optional[Client] = None
-try:
-    supabase_url = os.getenv('SUPABASE_URL')
-    supabase_key = os.getenv('SUPABASE_KEY')
-    
-    if not supabase_url or not supabase_key:
-        logger.error("⚠️ Supabase 환경 변수가 설정되지 않았습니다.")
-        raise ValueError("SUPABASE_URL과 SUPABASE_KEY가 필요합니다.")
-    
-    supabase = create_client(supabase_url, supabase_key)
-    logger.info("✅ Supabase 연결 성공")
-except Exception as e:
-    logger.error(f"❌ Supabase 연결 실패: {e}")
-    supabase = None
+if DATABASE_BACKEND == 'supabase':
+    try:
+        supabase_url = os.getenv('SUPABASE_URL')
+        supabase_key = os.getenv('SUPABASE_KEY')
+        
+        if not supabase_url or not supabase_key:
+            logger.error("⚠️ Supabase 환경 변수가 설정되지 않았습니다.")
+            raise ValueError("SUPABASE_URL과 SUPABASE_KEY가 필요합니다.")
+        
+        supabase = create_client(supabase_url, supabase_key,
+                                 options=ClientOptions(httpx_client=create_supabase_http_client()))
+        logger.info("✅ Supabase 연결 성공")
+    except Exception as e:
+        logger.error(f"❌ Supabase 연결 실패: {e}")
+        supabase = None
+
+repository: Optional[Repository] = create_repository(
+    DATABASE_BACKEND, supabase_client=supabase, database_url=DATABASE_URL, sqlite_path=SQLITE_PATH,
+    pool_min=DATABASE_POOL_MIN, pool_max=DATABASE_POOL_MAX, timeout=DATABASE_TIMEOUT)
 
 @app.route('/health')
 def health_check():
@@ -236,6 +197,137 @@ def health_check():
 def not_found(error):
     return jsonify({'error': 'Page not found'}), 404
 
+@app.after_request
+def record_supabase_timing(response):
+    """요청별 Supabase 호출 수/시간을 Server-Timing 헤더와 라우트별 통계에 기록하고 느린 요청은 로그로 남김"""
+    calls = g.get('supabase_calls', 0)
+    if calls:
+        elapsed_ms = g.supabase_ms
+        response.headers['Server-Timing'] = f'supabase;dur={elapsed_ms:.1f};desc="{calls} calls"'
+        
+        route = request.endpoint or request.path
+        with supabase_stats_lock:
+            stats = supabase_route_stats.setdefault(route, {'requests': 0, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['requests'] += 1
+            stats['calls'] += calls
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        
+        if elapsed_ms >= SUPABASE_SLOW_REQUEST_MS:
+            logger.warning(f"Supabase 호출이 느린 요청: {request.method} {request.path} ({calls}회, {elapsed_ms:.0f}ms)")
+    return response
+
+@app.errorhandler(413)
+def request_too_large(error):
+    message = f'업로드 파일이 너무 큽니다. (최대 {UPLOAD_MAX_BYTES // 1024 // 1024}MB)'
+    return jsonify({'success': False, 'error': message, 'message': message}), 413
+
+# 관리자 권한 확인 (사용자 역할 조회 결과를 프로세스 메모리에 ROLE_CACHE_TTL 동안 캐시)
+ROLE_CACHE_TTL = int(os.getenv('ROLE_CACHE_TTL_SECONDS', '60'))
+
+role_cache = {}
+role_cache_lock = threading.Lock()
+
+# 세션 프로필 스냅샷 (역할, 소속): 버전이 그대로이고 PROFILE_SNAPSHOT_TTL 이내면 DB 조회 없이 사용
+# 버전은 프로세스 메모리에 있으므로 다른 프로세스에서 바뀐 내용은 TTL이 지나면 반영
+PROFILE_SNAPSHOT_TTL = int(os.getenv('PROFILE_SNAPSHOT_TTL_SECONDS', '300'))
+
+profile_versions = {}
+profile_base_version = 0
+
+def cache_user_role(user_id, role):
+    """사용자 역할을 캐시에 저장 (다른 조회에서 이미 역할을 읽었을 때도 사용)"""
+    with role_cache_lock:
+        role_cache[user_id] = (role, time.time())
+
+def invalidate_user_profile(user_id=None):
+    """역할/소속이 바뀌거나 삭제된 사용자의 역할 캐시를 지우고 프로필 버전을 올림 (user_id가 없으면 전체)"""
+    global profile_base_version
+    with role_cache_lock:
+        if user_id is None:
+            role_cache.clear()
+            profile_base_version += 1
+        else:
+            role_cache.pop(user_id, None)
+            profile_versions[user_id] = profile_versions.get(user_id, 0) + 1
+
+def get_user_role(user_id):
+    """사용자 역할 조회 (TTL 캐시 사용, 없는 사용자는 None, 조회 실패는 캐시하지 않고 None)"""
+    with role_cache_lock:
+        cached = role_cache.get(user_id)
+    if cached and time.time() - cached[1] < ROLE_CACHE_TTL:
+        return cached[0]
+    
+    try:
+        role = repository.get_user_role(user_id)
+    except Exception as e:
+        logger.error(f"사용자 역할 조회 에러: {e}")
+        return None
+    
+    cache_user_role(user_id, role)
+    return role
+
+def profile_version(user_id):
+    """사용자 프로필 버전 (전체 변경 버전.사용자별 변경 버전)"""
+    with role_cache_lock:
+        return f"{profile_base_version}.{profile_versions.get(user_id, 0)}"
+
+def profile_snapshot(user, version):
+    """users 행(소속 이름 포함)으로 세션에 저장할 프로필 스냅샷 생성"""
+    return {
+        'role': user['role'],
+        'department_id': user['department_id'],
+        'department_name': user['departments']['name'] if user['departments'] else None,
+        'created_at': user['created_at'],
+        'version': version,
+        'fetched_at': time.time()
+    }
+
+def session_profile():
+    """현재 로그인 사용자의 프로필 스냅샷 (오래됐으면 다시 조회해 세션 갱신, 없는 사용자는 None)"""
+    user = session['user']
+    version = profile_version(user['id'])
+    profile = user.get('profile')
+    if profile and profile['version'] == version and time.time() - profile['fetched_at'] < PROFILE_SNAPSHOT_TTL:
+        return profile
+    
+    user_info = repository.get_user(user['id'])
+    if not user_info:
+        return None
+    
+    profile = profile_snapshot(user_info, version)
+    cache_user_role(user['id'], profile['role'])
+    session['user'] = {**user, 'profile': profile}
+    return profile
+
+def is_admin_session():
+    """현재 로그인 사용자가 관리자인지 확인 (기본 admin 계정은 조회 없이 허용)"""
+    if session['user']['username'] == 'admin':
+        return True
+    return get_user_role(session['user']['id']) == 'admin'
+
+def admin_required(view):
+    """관리자 전용 API (비로그인 401, 관리자 아님 403)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify({'error': '로그인이 필요합니다.'}), 401
+        if not is_admin_session():
+            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def admin_page_required(view):
+    """관리자 전용 페이지 (비로그인은 로그인 페이지, 관리자 아니면 대시보드로 이동)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user' not in session:
+            return redirect(url_for('login'))
+        if not is_admin_session():
+            return redirect(url_for('dashboard'))
+        return view(*args, **kwargs)
+    return wrapper
+
 @app.route('/')
 def index():
     if 'user' in session:
@@ -264,8 +356,8 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        # Supabase 연결 확인
-        if not supabase:
+        # 데이터베이스 연결 확인
+        if not repository:
             return render_template('login.html', error="데이터베이스 연결에 문제가 있습니다. 관리자에게 문의하세요.")
         
         try:
@@ -279,16 +371,18 @@ def login():
                 logger.info("관리자 로그인 성공")
                 return redirect(url_for('admin_dashboard'))
             
-            # 일반 사용자 로그인 (사용자명만 확인)
-            user_data = supabase.table('users').select('*').eq('username', username).execute()
+            # 일반 사용자 로그인 (사용자명만 확인, 대시보드에 쓸 프로필도 함께 조회)
+            user = repository.get_user_by_username(username)
             
-            if user_data.data:
+            if user:
                 # 실제 구현에서는 비밀번호 해시 검증이 필요합니다
                 # 여기서는 간단히 사용자명만 확인
                 session['user'] = {
-                    'id': user_data.data[0]['id'],
-                    'username': user_data.data[0]['username']
+                    'id': user['id'],
+                    'username': user['username'],
+                    'profile': profile_snapshot(user, profile_version(user['id']))
                 }
+                cache_user_role(user['id'], user['role'])
                 logger.info(f"사용자 로그인 성공: {username}")
                 return redirect(url_for('dashboard'))
             else:
@@ -308,14 +402,12 @@ def register():
         password = request.form['password']
         department_id = request.form.get('department')
         
-        if not supabase:
+        if not repository:
             return render_template('register.html', error="데이터베이스 연결에 문제가 있습니다. 관리자에게 문의하세요.")
         
         try:
             # 사용자명 중복 검사
-            existing_user = supabase.table('users').select('username').eq('username', username).execute()
-            
-            if existing_user.data:
+            if repository.get_user_by_username(username):
                 return render_template('register.html', error="이미 사용 중인 사용자명입니다. 다른 사용자명을 선택해주세요.")
             
             # 사용자 ID 생성
@@ -333,9 +425,7 @@ def register():
             if department_id:
                 user_data['department_id'] = department_id
             
-            result = supabase.table('users').insert(user_data).execute()
-            
-            if result.data:
+            if repository.insert_user(user_data):
                 # 성공 메시지를 세션에 저장하고 로그인 페이지로 리다이렉트
                 session['success_message'] = '회원가입이 완료되었습니다! 로그인해주세요.'
                 return redirect(url_for('login'))
@@ -344,15 +434,15 @@ def register():
                 
         except Exception as e:
             logger.error(f"회원가입 에러: {e}")
-            # 중복 키 오류인 경우 특별 처리
-            if "duplicate key value violates unique constraint" in str(e):
+            # 중복 키 오류인 경우 특별 처리 (Postgres/SQLite 오류 메시지)
+            if "duplicate key value violates unique constraint" in str(e) or "UNIQUE constraint failed" in str(e):
                 return render_template('register.html', error="이미 사용 중인 사용자명입니다. 다른 사용자명을 선택해주세요.")
             return render_template('register.html', error="회원가입 중 오류가 발생했습니다. 다시 시도해주세요.")
     
     # GET 요청 시 소속 목록 조회
     try:
-        if supabase:
-            departments = supabase.table('departments').select('*').execute().data
+        if repository:
+            departments = repository.list_departments()
         else:
             departments = []
     except Exception as e:
@@ -369,8 +459,8 @@ def dashboard():
     user_id = session['user']['id']
     username = session['user']['username']
     
-    # Supabase 연결 확인
-    if not supabase:
+    # 데이터베이스 연결 확인
+    if not repository:
         return render_template('error.html', error="데이터베이스 연결에 문제가 있습니다.")
     
     try:
@@ -378,21 +468,20 @@ def dashboard():
         if username == 'admin':
             return render_template('admin_dashboard.html', user={'username': 'admin', 'role': 'admin'})
         
-        # 일반 사용자 정보와 소속 정보를 함께 조회
-        user_info = supabase.table('users').select('*, departments(name)').eq('id', user_id).execute()
+        # 세션의 프로필 스냅샷 사용 (버전이 바뀌었거나 오래된 경우에만 소속 정보와 함께 다시 조회)
+        profile = session_profile()
         
-        if user_info.data:
-            user = user_info.data[0]
+        if profile:
             user_data = {
-                'id': user['id'],
-                'username': user['username'],
-                'role': user['role'],
-                'department_id': user['department_id'],
-                'department_name': user['departments']['name'] if user['departments'] else None,
-                'created_at': user['created_at']
+                'id': user_id,
+                'username': username,
+                'role': profile['role'],
+                'department_id': profile['department_id'],
+                'department_name': profile['department_name'],
+                'created_at': profile['created_at']
             }
             
-            if user['role'] == 'admin':
+            if profile['role'] == 'admin':
                 return render_template('admin_dashboard.html', user=user_data)
             else:
                 return render_template('dashboard.html', user=user_data)
@@ -403,44 +492,16 @@ def dashboard():
         return redirect(url_for('login'))
 
 @app.route('/admin_dashboard')
+@admin_page_required
 def admin_dashboard():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    
-    user_id = session['user']['id']
     username = session['user']['username']
     
-    # Supabase 연결 확인
-    if not supabase:
+    # 데이터베이스 연결 확인
+    if not repository:
         return render_template('error.html', error="데이터베이스 연결에 문제가 있습니다.")
     
-    # 관리자 권한 확인
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', user_id).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return redirect(url_for('dashboard'))
-        except:
-            return redirect(url_for('dashboard'))
-    
-    try:
-        # 관리자용 데이터 로드
-        departments = supabase.table('departments').select('*').execute().data
-        users = supabase.table('users').select('*, departments(name)').execute().data
-        work_logs = supabase.table('work_logs').select('*, users(username, departments(name))').execute().data
-        
-        return render_template('admin_dashboard.html', 
-                             user={'username': username, 'role': 'admin'},
-                             departments=departments,
-                             users=users,
-                             tasks=work_logs)
-    except Exception as e:
-        logger.error(f"관리자 대시보드 에러: {e}")
-        return render_template('admin_dashboard.html', 
-                             user={'username': username, 'role': 'admin'},
-                             departments=[],
-                             users=[],
-                             tasks=[])
+    # 업무 목록/소속/통계는 페이지에서 API로 불러옴 (/api/admin/tasks는 페이지 단위)
+    return render_template('admin_dashboard.html', user={'username': username, 'role': 'admin'})
 
 @app.route('/test')
 def test():
@@ -457,6 +518,15 @@ def logout():
     return redirect(url_for('login'))
 
 # API 엔드포인트들
+
+# 작업자 업무 목록은 대시보드에서 그리는 열(+ 커서용 created_at)만 조회해 페이지로 반환
+# 첫 페이지에는 기간 내 진행중 업무 전체(in_progress)를 페이지와 별도로 함께 반환
+TASK_HISTORY_COLUMNS = ('id', 'work_date', 'start_time', 'end_time', 'task_type', 'description',
+                        'complete_description', 'status', 'created_at')
+TASKS_PAGE_SIZE = int(os.getenv('TASKS_PAGE_SIZE', '50'))
+TASKS_MAX_PAGE_SIZE = 200
+TASKS_MAX_RANGE_DAYS = int(os.getenv('TASKS_MAX_RANGE_DAYS', '366'))
+
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
     if 'user' not in session:
@@ -464,7 +534,7 @@ def get_tasks():
     
     user_id = session['user']['id']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -472,25 +542,39 @@ def get_tasks():
         date_filter = request.args.get('date')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        status = request.args.get('status')
+        if status and status not in ('진행중', '완료'):
+            return jsonify({'error': '올바르지 않은 상태 값입니다.'}), 400
         
-        # 기본 쿼리 (사용자별)
-        query = supabase.table('work_logs').select('*').eq('user_id', user_id)
+        try:
+            after, limit = parse_task_page(TASKS_PAGE_SIZE, TASKS_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': '올바르지 않은 cursor 또는 limit 값입니다.'}), 400
         
         # 날짜 필터 적용
         if date_filter:
-            query = query.eq('work_date', date_filter)
-        elif start_date and end_date:
-            query = query.gte('work_date', start_date).lte('work_date', end_date)
-        else:
+            start_date = end_date = date_filter
+        elif not (start_date and end_date):
             # 기본값: 한국 시간 기준 오늘 날짜
-            today = get_korean_date().isoformat()
-            query = query.eq('work_date', today)
-        
-        # 정렬 (최신순)
-        query = query.order('created_at', desc=True)
+            start_date = end_date = get_korean_date().isoformat()
         
-        result = query.execute()
-        return jsonify(result.data)
+        # 기간 제한 (시작일 <= 종료일, 최대 TASKS_MAX_RANGE_DAYS일)
+        try:
+            days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+        except ValueError:
+            return jsonify({'error': '올바르지 않은 날짜 값입니다.'}), 400
+        if not 1 <= days <= TASKS_MAX_RANGE_DAYS:
+            return jsonify({'error': f'조회 기간은 시작일부터 최대 {TASKS_MAX_RANGE_DAYS}일까지 가능합니다.'}), 400
+        
+        # 사용자별 업무 (최신순), 다음 페이지 유무 확인용으로 1개 더 조회
+        rows = repository.list_user_tasks(user_id, start_date, end_date, columns=TASK_HISTORY_COLUMNS,
+                                          status=status, after=after, limit=limit + 1)
+        items, next_cursor = task_page(rows, limit)
+        page = {'items': items, 'next_cursor': next_cursor}
+        if after is None:
+            page['in_progress'] = repository.list_user_tasks(user_id, start_date, end_date,
+                                                             columns=TASK_HISTORY_COLUMNS, status='진행중')
+        return jsonify(page)
         
     except Exception as e:
         logger.error(f"업무 목록 조회 에러: {e}")
@@ -503,7 +587,7 @@ def create_task():
     
     user_id = session['user']['id']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -526,10 +610,10 @@ def create_task():
             'created_at': get_korean_datetime().isoformat()
         }
         
-        result = supabase.table('work_logs').insert(task_data).execute()
+        task = repository.insert_task(task_data)
         
-        if result.data:
-            return jsonify(result.data[0]), 201
+        if task:
+            return jsonify(task), 201
         else:
             return jsonify({'error': '업무 등록에 실패했습니다.'}), 500
             
@@ -545,20 +629,17 @@ def get_task(task_id):
     user_id = session['user']['id']
     username = session['user']['username']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 관리자는 모든 업무 조회 가능, 일반 사용자는 자신의 업무만
-        if username == 'admin':
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).execute()
-        else:
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).eq('user_id', user_id).execute()
+        task = repository.get_task(task_id, None if username == 'admin' else user_id)
         
-        if not task_result.data:
+        if not task:
             return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
         
-        return jsonify(task_result.data[0])
+        return jsonify(task)
         
     except Exception as e:
         logger.error(f"업무 조회 에러: {e}")
@@ -572,7 +653,7 @@ def update_task(task_id):
     user_id = session['user']['id']
     username = session['user']['username']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -584,15 +665,6 @@ def update_task(task_id):
             if not data.get(field):
                 return jsonify({'error': f'{field} 필드가 필요합니다.'}), 400
         
-        # 관리자는 모든 업무 수정 가능, 일반 사용자는 자신의 업무만
-        if username == 'admin':
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).execute()
-        else:
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).eq('user_id', user_id).execute()
-        
-        if not task_result.data:
-            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
-        
         # 업무 수정
         update_data = {
             'work_date': data['work_date'],
@@ -611,12 +683,13 @@ def update_task(task_id):
         if data.get('complete_description'):
             update_data['complete_description'] = data['complete_description']
         
-        result = supabase.table('work_logs').update(update_data).eq('id', task_id).execute()
+        # 관리자는 모든 업무 수정 가능, 일반 사용자는 자신의 업무만 (권한 확인과 수정을 한 번에)
+        task = repository.update_task(task_id, update_data, None if username == 'admin' else user_id)
         
-        if result.data:
-            return jsonify(result.data[0])
+        if task:
+            return jsonify(task)
         else:
-            return jsonify({'error': '업무 수정에 실패했습니다.'}), 500
+            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
             
     except Exception as e:
         logger.error(f"업무 수정 에러: {e}")
@@ -630,26 +703,15 @@ def delete_task(task_id):
     user_id = session['user']['id']
     username = session['user']['username']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
-        # 관리자는 모든 업무 삭제 가능, 일반 사용자는 자신의 업무만
-        if username == 'admin':
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).execute()
-        else:
-            task_result = supabase.table('work_logs').select('*').eq('id', task_id).eq('user_id', user_id).execute()
-        
-        if not task_result.data:
-            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
-        
-        # 업무 삭제
-        result = supabase.table('work_logs').delete().eq('id', task_id).execute()
-        
-        if result.data:
+        # 관리자는 모든 업무 삭제 가능, 일반 사용자는 자신의 업무만 (권한 확인과 삭제를 한 번에)
+        if repository.delete_task(task_id, None if username == 'admin' else user_id):
             return jsonify({'message': '업무가 삭제되었습니다.'})
         else:
-            return jsonify({'error': '업무 삭제에 실패했습니다.'}), 500
+            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
             
     except Exception as e:
         logger.error(f"업무 삭제 에러: {e}")
@@ -662,7 +724,7 @@ def complete_task(task_id):
     
     user_id = session['user']['id']
     
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -672,12 +734,6 @@ def complete_task(task_id):
         if not data.get('end_time'):
             return jsonify({'error': '종료 시간이 필요합니다.'}), 400
         
-        # 업무 존재 및 권한 확인
-        task_result = supabase.table('work_logs').select('*').eq('id', task_id).eq('user_id', user_id).execute()
-        
-        if not task_result.data:
-            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
-        
         # 업무 완료 처리
         update_data = {
             'end_time': data['end_time'],
@@ -686,12 +742,13 @@ def complete_task(task_id):
             'updated_at': get_korean_datetime().isoformat()
         }
         
-        result = supabase.table('work_logs').update(update_data).eq('id', task_id).execute()
+        # 업무 존재 및 권한 확인을 완료 처리와 한 번에 (본인 업무가 아니면 수정된 행 없음)
+        task = repository.update_task(task_id, update_data, user_id)
         
-        if result.data:
-            return jsonify(result.data[0])
+        if task:
+            return jsonify(task)
         else:
-            return jsonify({'error': '업무 완료 처리에 실패했습니다.'}), 500
+            return jsonify({'error': '업무를 찾을 수 없거나 권한이 없습니다.'}), 404
             
     except Exception as e:
         logger.error(f"업무 완료 처리 에러: {e}")
@@ -699,26 +756,14 @@ def complete_task(task_id):
 
 # 관리자용 API 엔드포인트들
 @app.route('/api/users', methods=['GET'])
+@admin_required
 def get_users():
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 사용자 목록 조회 (소속 정보 포함)
-        users = supabase.table('users').select('*, departments(name)').execute().data
+        users = repository.list_users()
         
         # 응답 데이터 형식 변환
         user_list = []
@@ -740,26 +785,14 @@ def get_users():
         return jsonify({'error': '사용자 목록 조회에 실패했습니다.'}), 500
 
 @app.route('/api/departments', methods=['GET'])
+@admin_required
 def get_departments():
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 소속 목록 조회
-        departments = supabase.table('departments').select('*').order('created_at', desc=True).execute().data
+        departments = repository.list_departments(newest_first=True)
         return jsonify(departments)
         
     except Exception as e:
@@ -767,21 +800,9 @@ def get_departments():
         return jsonify({'error': '소속 목록 조회에 실패했습니다.'}), 500
 
 @app.route('/api/departments', methods=['POST'])
+@admin_required
 def create_department():
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -797,10 +818,10 @@ def create_department():
             'created_at': get_korean_datetime().isoformat()
         }
         
-        result = supabase.table('departments').insert(department_data).execute()
+        department = repository.insert_department(department_data)
         
-        if result.data:
-            return jsonify(result.data[0]), 201
+        if department:
+            return jsonify(department), 201
         else:
             return jsonify({'error': '소속 생성에 실패했습니다.'}), 500
             
@@ -809,21 +830,9 @@ def create_department():
         return jsonify({'error': '소속 생성에 실패했습니다.'}), 500
 
 @app.route('/api/departments/<dept_id>', methods=['PUT'])
+@admin_required
 def update_department(dept_id):
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -834,10 +843,12 @@ def update_department(dept_id):
             return jsonify({'error': '소속명이 필요합니다.'}), 400
         
         # 소속 수정
-        result = supabase.table('departments').update({'name': name}).eq('id', dept_id).execute()
+        department = repository.update_department(dept_id, {'name': name})
+        # 세션 프로필 스냅샷의 소속 이름이 바뀌므로 전체 프로필 버전을 올림
+        invalidate_user_profile()
         
-        if result.data:
-            return jsonify(result.data[0])
+        if department:
+            return jsonify(department)
         else:
             return jsonify({'error': '소속 수정에 실패했습니다.'}), 500
             
@@ -846,28 +857,17 @@ def update_department(dept_id):
         return jsonify({'error': '소속 수정에 실패했습니다.'}), 500
 
 @app.route('/api/departments/<dept_id>', methods=['DELETE'])
+@admin_required
 def delete_department(dept_id):
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 소속 삭제
-        result = supabase.table('departments').delete().eq('id', dept_id).execute()
+        deleted = repository.delete_department(dept_id)
+        invalidate_user_profile()
         
-        if result.data:
+        if deleted:
             return jsonify({'message': '소속이 삭제되었습니다.'})
         else:
             return jsonify({'error': '소속 삭제에 실패했습니다.'}), 500
@@ -878,53 +878,23 @@ def delete_department(dept_id):
 
 # 관리자 페이지 라우트
 @app.route('/admin_users')
+@admin_page_required
 def admin_users():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    
-    # 관리자 권한 확인
     username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return redirect(url_for('dashboard'))
-        except:
-            return redirect(url_for('dashboard'))
     
     return render_template('admin_users.html', user={'username': username, 'role': 'admin'})
 
 @app.route('/admin_departments')
+@admin_page_required
 def admin_departments():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    
-    # 관리자 권한 확인
     username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return redirect(url_for('dashboard'))
-        except:
-            return redirect(url_for('dashboard'))
     
     return render_template('admin_departments.html', user={'username': username, 'role': 'admin'})
 
 @app.route('/missing_response')
+@admin_page_required
 def missing_response():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    
-    # 관리자 권한 확인
     username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return redirect(url_for('dashboard'))
-        except:
-            return redirect(url_for('dashboard'))
     
     return render_template('missing_response.html', user={'username': username, 'role': 'admin'})
 
@@ -941,61 +911,33 @@ def pwa_install():
 @app.route('/api/init-database', methods=['POST'])
 def init_database():
     """데이터베이스 완전 초기화 (KST 시간대 적용)"""
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         logger.info("🔄 데이터베이스 초기화 시작...")
         
-        # 1단계: 기존 데이터 삭제
+        # 1단계: 기존 데이터 삭제 (업무 로그, admin 외 사용자, 소속)
         try:
-            # work_logs 삭제
-            supabase.table('work_logs').delete().neq('id', 0).execute()
-            logger.info("✅ work_logs 데이터 삭제 완료")
-            
-            # users 삭제 (admin 제외)
-            supabase.table('users').delete().neq('username', 'admin').execute()
-            logger.info("✅ users 데이터 삭제 완료")
-            
-            # departments 삭제
-            supabase.table('departments').delete().neq('id', 0).execute()
-            logger.info("✅ departments 데이터 삭제 완료")
+            deleted = repository.reset_data()
+            invalidate_user_profile()
+            logger.info(f"✅ 기존 데이터 삭제 완료: {deleted}")
             
         except Exception as e:
             logger.warning(f"기존 데이터 삭제 중 오류 (무시): {e}")
         
-        # 2단계: 기본 데이터 삽입
+        # 2단계: 기본 데이터 삽입 (기본 소속, admin 계정 확인 및 생성)
         try:
-            # departments 삽입
-            departments_data = [
-                {'name': 'B동보충'},
-                {'name': 'A지상보충'},
-                {'name': 'A지하보충'}
-            ]
-            
-            for dept in departments_data:
-                supabase.table('departments').insert(dept).execute()
+            seeded = repository.seed_defaults()
             logger.info("✅ departments 데이터 삽입 완료")
-            
-            # admin 계정 확인 및 생성
-            admin_check = supabase.table('users').select('*').eq('username', 'admin').execute()
-            if not admin_check.data:
-                admin_data = {
-                    'username': 'admin',
-                    'password_hash': '0000',
-                    'role': 'admin'
-                }
-                supabase.table('users').insert(admin_data).execute()
-                logger.info("✅ admin 계정 생성 완료")
-            else:
-                logger.info("✅ admin 계정 이미 존재")
+            logger.info("✅ admin 계정 생성 완료" if seeded['admin_created'] else "✅ admin 계정 이미 존재")
             
             logger.info("✅ 데이터베이스 초기화 완료")
             return jsonify({
                 'message': '데이터베이스가 성공적으로 초기화되었습니다.',
                 'kst_time': get_korean_datetime().isoformat(),
                 'details': {
-                    'departments_created': len(departments_data),
+                    'departments_created': seeded['departments_created'],
                     'admin_account': 'admin/0000'
                 }
             })
@@ -1010,21 +952,9 @@ def init_database():
 
 # 추가 관리자 API 엔드포인트
 @app.route('/api/users/<user_id>/department', methods=['PUT'])
+@admin_required
 def update_user_department(user_id):
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -1035,10 +965,11 @@ def update_user_department(user_id):
             return jsonify({'error': '소속 ID가 필요합니다.'}), 400
         
         # 사용자 소속 업데이트
-        result = supabase.table('users').update({'department_id': department_id}).eq('id', user_id).execute()
+        user = repository.update_user(user_id, {'department_id': department_id})
+        invalidate_user_profile(user_id)
         
-        if result.data:
-            return jsonify(result.data[0])
+        if user:
+            return jsonify(user)
         else:
             return jsonify({'error': '사용자 소속 변경에 실패했습니다.'}), 500
             
@@ -1047,28 +978,14 @@ def update_user_department(user_id):
         return jsonify({'error': '사용자 소속 변경에 실패했습니다.'}), 500
 
 @app.route('/api/users/<user_id>/reset-password', methods=['PUT'])
+@admin_required
 def reset_user_password(user_id):
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 비밀번호를 1234로 초기화
-        result = supabase.table('users').update({'password_hash': '1234'}).eq('id', user_id).execute()
-        
-        if result.data:
+        if repository.update_user(user_id, {'password_hash': '1234'}):
             return jsonify({'message': '비밀번호가 초기화되었습니다.'})
         else:
             return jsonify({'error': '비밀번호 초기화에 실패했습니다.'}), 500
@@ -1078,28 +995,17 @@ def reset_user_password(user_id):
         return jsonify({'error': '비밀번호 초기화에 실패했습니다.'}), 500
 
 @app.route('/api/users/<user_id>', methods=['DELETE'])
+@admin_required
 def delete_user(user_id):
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         # 사용자 삭제
-        result = supabase.table('users').delete().eq('id', user_id).execute()
+        deleted = repository.delete_user(user_id)
+        invalidate_user_profile(user_id)
         
-        if result.data:
+        if deleted:
             return jsonify({'message': '사용자가 삭제되었습니다.'})
         else:
             return jsonify({'error': '사용자 삭제에 실패했습니다.'}), 500
@@ -1108,23 +1014,44 @@ def delete_user(user_id):
         logger.error(f"사용자 삭제 에러: {e}")
         return jsonify({'error': '사용자 삭제에 실패했습니다.'}), 500
 
-# 관리자용 업무 목록 API
+# 관리자용 업무 목록 API (최신순 페이지, 다음 페이지는 마지막 행의 (created_at, id) 커서로 조회)
+ADMIN_TASKS_PAGE_SIZE = int(os.getenv('ADMIN_TASKS_PAGE_SIZE', '100'))
+ADMIN_TASKS_MAX_PAGE_SIZE = 500
+
+def encode_task_cursor(task):
+    """페이지 마지막 업무의 (created_at, id)를 다음 페이지 커서 문자열로 변환"""
+    raw = json.dumps([task['created_at'], task['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_task_cursor(cursor):
+    """커서 문자열을 (created_at, id)로 변환 (잘못된 값이면 ValueError)"""
+    try:
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('올바르지 않은 커서입니다.')
+    if not isinstance(created_at, str) or not isinstance(task_id, int):
+        raise ValueError('올바르지 않은 커서입니다.')
+    return created_at, task_id
+
+def parse_task_page(default_limit, max_limit):
+    """요청의 cursor/limit 값 검증 (잘못된 값이면 ValueError)"""
+    cursor = request.args.get('cursor')
+    after = decode_task_cursor(cursor) if cursor else None
+    limit = min(int(request.args.get('limit', default_limit)), max_limit)
+    if limit <= 0:
+        raise ValueError('limit은 1 이상이어야 합니다.')
+    return after, limit
+
+def task_page(rows, limit):
+    """limit + 1개까지 조회한 행에서 한 페이지와 다음 커서 반환 (마지막 페이지면 다음 커서는 None)"""
+    items = rows[:limit]
+    next_cursor = encode_task_cursor(items[-1]) if len(rows) > limit else None
+    return items, next_cursor
+
 @app.route('/api/admin/tasks', methods=['GET'])
+@admin_required
 def get_admin_tasks():
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
@@ -1140,48 +1067,24 @@ def get_admin_tasks():
         end_date = request.args.get('end_date')
         time_range = request.args.get('time_range')
         
-        # 기본 쿼리 (오늘 업무만)
-        query = supabase.table('work_logs').select('*, users(username, departments(name))').eq('work_date', today)
-        
-        # 필터 적용
-        if department:
-            query = query.eq('users.departments.name', department)
-        if task_type:
-            query = query.eq('task_type', task_type)
-        if status:
-            query = query.eq('status', status)
-        
-        # 기간 필터가 있는 경우 오늘 기준 제한 해제
-        if start_date and end_date:
-            query = supabase.table('work_logs').select('*, users(username, departments(name))').gte('work_date', start_date).lte('work_date', end_date)
-            if department:
-                query = query.eq('users.departments.name', department)
-            if task_type:
-                query = query.eq('task_type', task_type)
-            if status:
-                query = query.eq('status', status)
-        elif start_date:
-            query = supabase.table('work_logs').select('*, users(username, departments(name))').gte('work_date', start_date)
-            if department:
-                query = query.eq('users.departments.name', department)
-            if task_type:
-                query = query.eq('task_type', task_type)
-            if status:
-                query = query.eq('status', status)
-        elif end_date:
-            query = supabase.table('work_logs').select('*, users(username, departments(name))').lte('work_date', end_date)
-            if department:
-                query = query.eq('users.departments.name', department)
-            if task_type:
-                query = query.eq('task_type', task_type)
-            if status:
-                query = query.eq('status', status)
-        
-        # 정렬 (최신순)
-        query = query.order('created_at', desc=True)
-        
-        result = query.execute()
-        return jsonify(result.data)
+        try:
+            after, limit = parse_task_page(ADMIN_TASKS_PAGE_SIZE, ADMIN_TASKS_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': '올바르지 않은 cursor 또는 limit 값입니다.'}), 400
+        
+        # 기간 필터가 없으면 오늘 업무만 (기간 필터가 있는 경우 오늘 기준 제한 해제)
+        if not (start_date or end_date):
+            start_date = end_date = today
+        
+        # 필터 적용, 정렬 (최신순), 다음 페이지 유무 확인용으로 1개 더 조회
+        rows = repository.list_admin_tasks(start_date, end_date, department=department,
+                                           task_type=task_type, status=status,
+                                           after=after, limit=limit + 1)
+        items, next_cursor = task_page(rows, limit)
+        return jsonify({
+            'items': items,
+            'next_cursor': next_cursor
+        })
         
     except Exception as e:
         logger.error(f"관리자 업무 목록 조회 에러: {e}")
@@ -1189,56 +1092,18 @@ def get_admin_tasks():
 
 # 관리자 대시보드 통계 API
 @app.route('/api/admin/statistics', methods=['GET'])
+@admin_required
 def get_admin_statistics():
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
-    if not supabase:
+    if not repository:
         return jsonify({'error': '데이터베이스 연결에 문제가 있습니다.'}), 500
     
     try:
         today = get_korean_date().isoformat()
         logger.info(f"오늘 날짜 (KST): {today}")
         
-        # 총 작업자 수 (회원가입된 모든 사용자)
-        total_users = supabase.table('users').select('id').execute()
-        total_workers = len(total_users.data)
-        logger.info(f"총 작업자 수: {total_workers}")
-        
-        # 오늘 작업 참여자 수 (오늘 업무를 등록한 사용자)
-        today_workers = supabase.table('work_logs').select('user_id').eq('work_date', today).execute()
-        today_participants = len(set(task['user_id'] for task in today_workers.data))
-        logger.info(f"오늘 작업 참여자 수: {today_participants}")
-        
-        # 오늘 업무 통계 (오늘 날짜 기준)
-        today_tasks = supabase.table('work_logs').select('status').eq('work_date', today).execute()
-        logger.info(f"오늘 업무 데이터: {today_tasks.data}")
-        
-        today_completed_tasks = len([task for task in today_tasks.data if task['status'] == '완료'])
-        today_ongoing_tasks = len([task for task in today_tasks.data if task['status'] == '진행중'])
-        today_total_tasks = len(today_tasks.data)
-        
-        logger.info(f"오늘 완료된 업무: {today_completed_tasks}")
-        logger.info(f"오늘 진행중인 업무: {today_ongoing_tasks}")
-        logger.info(f"오늘 총 업무: {today_total_tasks}")
-        
-        statistics = {
-            'total_workers': total_workers,
-            'today_participants': today_participants,
-            'completed_tasks': today_completed_tasks,
-            'ongoing_tasks': today_ongoing_tasks,
-            'total_tasks': today_total_tasks
-        }
+        # 총 작업자 수 (회원가입된 모든 사용자), 오늘 작업 참여자 수 (오늘 업무를 등록한 사용자),
+        # 오늘 업무 통계 (오늘 날짜 기준 완료/진행중/전체)
+        statistics = repository.task_statistics(today)
         
         logger.info(f"반환할 통계: {statistics}")
         return jsonify(statistics)
@@ -1247,17 +1112,387 @@ def get_admin_statistics():
         logger.error(f"관리자 통계 조회 에러: {e}")
         return jsonify({'error': '통계 조회에 실패했습니다.'}), 500
 
+# 미출대응 결과 캐시 (업로드 내용 SHA-256 + 기준코드 → 이전 결과 파일)
+MEECHUL_CACHE_MAX_BYTES = int(os.getenv('MEECHUL_CACHE_MAX_MB', '200')) * 1024 * 1024
+MEECHUL_CACHE_MAX_AGE = int(os.getenv('MEECHUL_CACHE_MAX_AGE_SECONDS', str(24 * 60 * 60)))
+
+meechul_cache = {}
+meechul_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'swept': 0}
+meechul_cache_lock = threading.Lock()
+
+# 변경분 모드용 기준코드별 직전 실행 그룹 지문 (캐시와 같이 프로세스별 메모리, 재시작 후 첫 실행은 전체가 신규)
+meechul_fingerprints = {}
+meechul_fingerprints_lock = threading.Lock()
+
+# 임시 디렉터리의 결과/테스트 파일 정리 주기 (캐시에서 빠진 파일도 보관 기간이 지나면 삭제)
+# 바로 받기 결과와 업로드 임시 파일은 요청이 끝나면 지우지만, 워커가 중간에 죽어 남은 파일도 같이 정리
+MEECHUL_SWEEP_INTERVAL = int(os.getenv('MEECHUL_SWEEP_INTERVAL_SECONDS', '600'))
+MEECHUL_DIRECT_PREFIX = '바로받기_'
+MEECHUL_RESULT_PREFIXES = ('정렬결과_', '테스트파일_', '미출대응결과_', '미출대응정렬_', MEECHUL_DIRECT_PREFIX,
+                           UPLOAD_SPILL_PREFIX)
+meechul_sweeper_started = False
+
+def meechul_cache_key(file_path, 기준코드):
+    """업로드 파일 내용의 SHA-256과 기준코드로 캐시 키 생성"""
+    digest = hashlib.sha256()
+    with open_upload(file_path) as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"{기준코드}:{digest.hexdigest()}"
+
+def evict_meechul_cache(now=None):
+    """오래된 결과와 용량 초과분(오래된 순)을 캐시와 임시 디렉터리에서 삭제 (lock 보유 상태에서 호출)"""
+    now = now or time.time()
+
+    def remove(key):
+        entry = meechul_cache.pop(key)
+        meechul_cache_stats['evictions'] += 1
+        try:
+            os.remove(entry['path'])
+        except OSError:
+            pass
+
+    for key in [k for k, v in meechul_cache.items() if now - v['created'] > MEECHUL_CACHE_MAX_AGE]:
+        remove(key)
+
+    total = sum(v['size'] for v in meechul_cache.values())
+    for key in sorted(meechul_cache, key=lambda k: meechul_cache[k]['created']):
+        if total <= MEECHUL_CACHE_MAX_BYTES:
+            break
+        total -= meechul_cache[key]['size']
+        remove(key)
+
+def meechul_cache_get(key):
+    """캐시된 결과 파일명을 반환 (없거나 만료/삭제되었으면 None)"""
+    with meechul_cache_lock:
+        evict_meechul_cache()
+        entry = meechul_cache.get(key)
+        if entry and not os.path.exists(entry['path']):
+            meechul_cache.pop(key)
+            entry = None
+
+        if entry:
+            meechul_cache_stats['hits'] += 1
+            return entry['filename']
+
+        meechul_cache_stats['misses'] += 1
+        return None
+
+def meechul_cache_put(key, filename, path):
+    """처리 결과 파일을 캐시에 등록하고 용량/기간 기준으로 정리"""
+    with meechul_cache_lock:
+        meechul_cache[key] = {
+            'filename': filename,
+            'path': path,
+            'size': os.path.getsize(path),
+            'created': time.time()
+        }
+        evict_meechul_cache()
+
+def sweep_meechul_results(now=None):
+    """만료된 캐시 항목과, 캐시에 없으면서 보관 기간이 지난 결과/테스트 파일(중단된 .part 포함)을 삭제"""
+    now = now or time.time()
+    with meechul_cache_lock:
+        evict_meechul_cache(now)
+        cached_paths = {entry['path'] for entry in meechul_cache.values()}
+
+    tmp_dir = tempfile.gettempdir()
+    removed = 0
+    for name in os.listdir(tmp_dir):
+        if not name.startswith(MEECHUL_RESULT_PREFIXES):
+            continue
+        path = os.path.join(tmp_dir, name)
+        if path in cached_paths:
+            continue
+        try:
+            if now - os.path.getmtime(path) > MEECHUL_CACHE_MAX_AGE:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+
+    if removed:
+        with meechul_cache_lock:
+            meechul_cache_stats['swept'] += removed
+        logger.info(f"만료된 결과 파일 {removed}개 삭제")
+    return removed
+
+def start_meechul_sweeper():
+    """결과 파일 정리 스레드를 워커 프로세스당 한 번만 시작 (처음 결과 파일을 만드는 요청에서 호출)"""
+    global meechul_sweeper_started
+    with meechul_cache_lock:
+        if meechul_sweeper_started or MEECHUL_SWEEP_INTERVAL <= 0:
+            return
+        meechul_sweeper_started = True
+
+    def sweep_loop():
+        while True:
+            try:
+                sweep_meechul_results()
+            except Exception as e:
+                logger.error(f"결과 파일 정리 오류: {e}")
+            time.sleep(MEECHUL_SWEEP_INTERVAL)
+
+    threading.Thread(target=sweep_loop, name='meechul-sweeper', daemon=True).start()
+
+# 백그라운드 Excel 처리 작업 (업로드 요청은 작업 ID만 받고 진행률은 /api/jobs/<job_id>로 조회)
+EXCEL_JOB_WORKERS = int(os.getenv('EXCEL_JOB_WORKERS', '2'))
+EXCEL_JOB_MAX_PENDING = int(os.getenv('EXCEL_JOB_MAX_PENDING', '8'))
+EXCEL_JOB_RETENTION = int(os.getenv('EXCEL_JOB_RETENTION_SECONDS', '3600'))
+
+excel_job_executor = ThreadPoolExecutor(max_workers=EXCEL_JOB_WORKERS, thread_name_prefix='excel-job')
+excel_jobs = {}
+excel_jobs_lock = threading.Lock()
+
+def submit_excel_job(kind, owner_id, func, *args):
+    """처리 함수를 작업 풀에 등록 (대기 작업이 한도를 넘으면 None)"""
+    now = time.time()
+    with excel_jobs_lock:
+        # 보관 기간이 지난 완료/실패 작업 정리
+        for job_id in [k for k, v in excel_jobs.items()
+                       if v['status'] in ('done', 'failed') and now - v['updated'] > EXCEL_JOB_RETENTION]:
+            excel_jobs.pop(job_id)
+
+        active = sum(1 for v in excel_jobs.values() if v['status'] in ('queued', 'running'))
+        if active >= EXCEL_JOB_WORKERS + EXCEL_JOB_MAX_PENDING:
+            return None
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'owner': owner_id,
+            'status': 'queued',
+            'progress': {'rows_read': 0, 'groups_built': 0, 'rows_written': 0},
+            'result': None,
+            'error': None,
+            'created_at': get_korean_datetime().isoformat(),
+            'updated': now
+        }
+        excel_jobs[job['id']] = job
+
+    def run():
+        job['status'] = 'running'
+        job['updated'] = time.time()
+        try:
+            job['result'] = func(*args, progress=job['progress'])
+            job['status'] = 'done'
+        except Exception as e:
+            logger.error(f"백그라운드 작업 실패 ({job['kind']} {job['id']}): {e}")
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        job['updated'] = time.time()
+
+    excel_job_executor.submit(run)
+    logger.info(f"백그라운드 작업 등록: {kind} {job['id']}")
+    return job
+
+def excel_job_response(job):
+    """작업 상태 응답 데이터 (완료 시 동기 처리와 같은 결과를 포함)"""
+    data = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': dict(job['progress']),
+        'created_at': job['created_at'],
+        'status_url': f"/api/jobs/{job['id']}"
+    }
+    if job['status'] == 'done':
+        data['result'] = job['result']
+    elif job['status'] == 'failed':
+        data['error'] = job['error']
+    return data
+
+# CPU 작업용 프로세스 풀 (GIL을 잡는 정렬 작업이 같은 워커의 다른 요청을 막지 않도록 분리)
+EXCEL_PROCESS_WORKERS = int(os.getenv('EXCEL_PROCESS_WORKERS', '2'))
+EXCEL_JOB_TIMEOUT = int(os.getenv('EXCEL_JOB_TIMEOUT_SECONDS', '300'))
+EXCEL_JOB_MAX_MEMORY_MB = int(os.getenv('EXCEL_JOB_MAX_MEMORY_MB', '1024'))
+
+excel_process_pool = None
+excel_process_manager = None
+excel_process_lock = threading.Lock()
+
+def get_excel_process_pool():
+    """프로세스 풀과 진행률 공유용 Manager를 처음 사용할 때 생성 (gunicorn fork 이후)
+
+    요청/작업 스레드가 이미 떠 있는 프로세스를 fork하면 자식이 상속된 lock(로깅 핸들러 등)에서
+    멈출 수 있으므로 forkserver 방식으로 워커를 띄운다.
+    워커에서 실행하는 함수는 모두 excel_engine 모듈에 있으므로 워커는 app(Flask, 저장소/DB 연결)을 import하지 않고,
+    forkserver가 excel_engine(pandas/openpyxl)을 미리 import해 두어 워커마다 다시 읽지 않는다.
+    """
+    global excel_process_pool, excel_process_manager
+    with excel_process_lock:
+        if excel_process_pool is None:
+            mp_context = multiprocessing.get_context('forkserver')
+            mp_context.set_forkserver_preload(['__main__', 'excel_engine'])
+            if excel_process_manager is None:
+                excel_process_manager = mp_context.Manager()
+            excel_process_pool = ProcessPoolExecutor(max_workers=EXCEL_PROCESS_WORKERS,
+                                                     mp_context=mp_context,
+                                                     initializer=init_excel_process,
+                                                     initargs=(EXCEL_JOB_MAX_MEMORY_MB,))
+            logger.info(f"Excel 프로세스 풀 생성: {EXCEL_PROCESS_WORKERS}개")
+        return excel_process_pool, excel_process_manager
+
+def reset_excel_process_pool():
+    """워커가 비정상 종료되어 깨진 프로세스 풀을 버리고 다음 요청에서 다시 생성"""
+    global excel_process_pool
+    with excel_process_lock:
+        if excel_process_pool is not None:
+            excel_process_pool.shutdown(wait=False, cancel_futures=True)
+            excel_process_pool = None
+
+def run_in_excel_process(func, *args, progress=None):
+    """CPU 작업을 프로세스 풀에서 실행하고 진행률을 progress에 반영 (풀 크기 0이면 현재 스레드에서 실행)"""
+    if EXCEL_PROCESS_WORKERS <= 0:
+        return func(*args, progress=progress)
+
+    pool, manager = get_excel_process_pool()
+    shared_progress = manager.dict(progress) if progress is not None else None
+    try:
+        future = pool.submit(run_excel_task, func, args, shared_progress, EXCEL_JOB_TIMEOUT)
+        while not future.done():
+            wait([future], timeout=0.5)
+            if progress is not None:
+                progress.update(shared_progress.copy())
+        return future.result()
+    except MemoryError:
+        raise MemoryError(f'처리 메모리가 제한({EXCEL_JOB_MAX_MEMORY_MB}MB)을 초과했습니다.')
+    except BrokenProcessPool:
+        reset_excel_process_pool()
+        raise RuntimeError('처리 프로세스가 비정상 종료되었습니다. (메모리 부족 등)')
+
+def run_meechul_process(file_path, 기준코드, engine='python', progress=None):
+    """업로드된 미출대응 파일을 정렬(또는 캐시 재사용)해 결과 파일 정보를 반환하고 입력 임시 파일을 정리"""
+    기준표시 = 'P1/P2/P3' if 기준코드 == 'ALL' else 기준코드
+    
+    try:
+        # 동일 파일 + 기준코드의 이전 결과가 있으면 바로 반환
+        cache_key = meechul_cache_key(file_path, 기준코드)
+        cached_filename = meechul_cache_get(cache_key)
+        if cached_filename:
+            discard_upload(file_path)
+            logger.info(f"캐시된 결과 반환: {cached_filename}")
+            return {
+                'success': True,
+                'cached': True,
+                'message': f'{기준표시} 정렬이 완료되었습니다. (이전 결과 재사용) 파일명: {cached_filename}',
+                'filename': cached_filename,
+                'download_url': f'/api/meechul-download/{cached_filename}'
+            }
+        
+        # Excel 처리 및 결과 파일 저장 (프로세스 풀)
+        logger.info(f"Excel 처리 시작: {기준코드}")
+        # 파일명에 입력 내용 해시를 포함해 같은 초에 끝난 다른 업로드와 결과 파일이 겹치지 않도록 함
+        content_hash = cache_key.split(':', 1)[1][:12]
+        output_filename = f"정렬결과_{기준코드}_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}_{content_hash}.xlsx"
+        output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        run_in_excel_process(sort_meechul_to_file, file_path, 기준코드, engine, output_path, progress=progress)
+        
+        logger.info(f"결과 파일 저장 완료: {output_path}")
+        meechul_cache_put(cache_key, output_filename, output_path)
+        
+        # 임시 입력 파일 삭제
+        discard_upload(file_path)
+        logger.info("임시 입력 파일 삭제 완료")
+        
+        return {
+            'success': True,
+            'cached': False,
+            'message': f'{기준표시} 정렬이 완료되었습니다. 파일명: {output_filename}',
+            'filename': output_filename,
+            'download_url': f'/api/meechul-download/{output_filename}'
+        }
+        
+    except Exception as e:
+        # 임시 파일 정리
+        discard_upload(file_path)
+        logger.info("오류 발생으로 임시 파일 정리 완료")
+        logger.error(f"Excel 처리 중 오류: {e}")
+        raise e
+
+def run_meechul_diff(file_path, 기준코드, engine='python', progress=None):
+    """직전 실행과 비교한 변경분(신규/변경/해결 그룹)만 결과 파일로 만들고 기준코드별 지문을 갱신
+
+    결과가 직전 지문에 따라 달라지므로 내용 캐시는 사용하지 않는다.
+    """
+    기준표시 = 'P1/P2/P3' if 기준코드 == 'ALL' else 기준코드
+    codes = ('P1', 'P2', 'P3') if 기준코드 == 'ALL' else (기준코드,)
+    
+    try:
+        with meechul_fingerprints_lock:
+            previous = {code: meechul_fingerprints[code] for code in codes if code in meechul_fingerprints}
+        
+        logger.info(f"Excel 변경분 처리 시작: {기준코드} (직전 실행: {', '.join(previous) or '없음'})")
+        output_filename = f"정렬결과_{기준코드}_변경분_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}.xlsx"
+        output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        indexes, summary = run_in_excel_process(sort_meechul_diff_to_file, file_path, 기준코드, engine,
+                                                output_path, previous, progress=progress)
+        
+        with meechul_fingerprints_lock:
+            meechul_fingerprints.update(indexes)
+        logger.info(f"변경분 결과 파일 저장 완료: {output_path}, {summary}")
+        
+        요약 = ', '.join(f"{code} 신규 {counts['new']}·변경 {counts['changed']}·해결 {counts['resolved']}"
+                       for code, counts in summary.items())
+        return {
+            'success': True,
+            'cached': False,
+            'message': f'{기준표시} 변경분 정렬이 완료되었습니다. ({요약}) 파일명: {output_filename}',
+            'filename': output_filename,
+            'download_url': f'/api/meechul-download/{output_filename}',
+            'diff': summary,
+            # 직전 실행이 없어 전체가 신규로 나온 기준코드
+            'baseline': [code for code in codes if code not in previous]
+        }
+    finally:
+        discard_upload(file_path)
+
+def stream_meechul_result(file_path, 기준코드, engine='python'):
+    """정렬 결과를 캐시/다운로드 목록에 남기지 않고 바로 내려받는 응답으로 반환 (캐시된 결과가 있으면 그 파일을 전송)
+
+    워커가 임시 파일에 저장한 결과를 메모리에 올리지 않고 파일에서 바로 전송한다.
+    """
+    try:
+        cache_key = meechul_cache_key(file_path, 기준코드)
+        cached_filename = meechul_cache_get(cache_key)
+        if cached_filename:
+            logger.info(f"캐시된 결과 전송: {cached_filename}")
+            return send_file(
+                os.path.join(tempfile.gettempdir(), cached_filename),
+                as_attachment=True,
+                download_name=cached_filename,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+
+        logger.info(f"Excel 처리 시작 (바로 받기): {기준코드}")
+        fd, output_path = tempfile.mkstemp(prefix=MEECHUL_DIRECT_PREFIX, suffix='.xlsx')
+        os.close(fd)
+        try:
+            run_in_excel_process(sort_meechul_to_file, file_path, 기준코드, engine, output_path)
+            # 연 채로 이름을 지워 두면 전송이 끝나(또는 연결이 끊겨) 파일이 닫힐 때 디스크에서 사라짐
+            # (send_file 응답은 call_on_close 콜백이 호출되지 않으므로 파일 핸들로 정리)
+            output = open(output_path, 'rb')
+        finally:
+            os.remove(output_path)
+        size = os.fstat(output.fileno()).st_size
+        logger.info(f"결과 전송: {size} bytes")
+    finally:
+        discard_upload(file_path)
+
+    response = send_file(
+        output,
+        as_attachment=True,
+        download_name=f"정렬결과_{기준코드}_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response.content_length = size
+    return response
+
 # 미출대응 엑셀 파일 처리 API
 @app.route('/api/meechul-process', methods=['POST'])
+@admin_required
 def meechul_process():
     """미출대응 Excel 파일 처리"""
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    if session['user'].get('role') != 'admin':
-        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
     try:
         # 파일 업로드 확인
         if 'file' not in request.files:
@@ -1267,74 +1502,103 @@ def meechul_process():
         if file.filename == '':
             return jsonify({'error': '파일이 선택되지 않았습니다.'}), 400
         
-        # 파일 확장자 확인
-        if not file.filename.lower().endswith(('.xlsx', '.xls')):
-            return jsonify({'error': 'Excel 파일만 업로드 가능합니다.'}), 400
-        
-        # 기준 코드 확인
+        # 기준 코드 확인 (ALL: P1/P2/P3 시트를 한 번에 생성)
         기준코드 = request.form.get('criteria', 'P3')
-        if 기준코드 not in ['P1', 'P2', 'P3']:
+        if 기준코드 not in ['P1', 'P2', 'P3', 'ALL']:
             return jsonify({'error': '올바르지 않은 기준 코드입니다.'}), 400
         
+        # 처리 엔진 확인 (python: 기본, pandas: 벡터 연산)
+        engine = request.form.get('engine', 'python')
+        if engine not in MEECHUL_ENGINES:
+            return jsonify({'error': '올바르지 않은 처리 엔진입니다.'}), 400
+        
+        # 변경분 모드: 같은 기준코드의 직전 실행과 비교해 신규/변경/해결 그룹만 출력
+        diff = request.form.get('diff') in ('1', 'true')
+        stream = request.form.get('stream') in ('1', 'true')
+        if diff and stream:
+            return jsonify({'error': '변경분 모드는 결과 파일 바로 받기와 함께 사용할 수 없습니다.'}), 400
+        process = run_meechul_diff if diff else run_meechul_process
+        
         logger.info(f"미출대응 처리 시작: 파일={file.filename}, 기준코드={기준코드}")
         
-        # 임시 파일로 저장
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            file.save(tmp_file.name)
-            file_path = tmp_file.name
+        # 요청을 받으면서 메모리(크면 임시 파일)에 받아 둔 업로드를 그대로 사용
+        file_path = take_upload(file)
         
-        logger.info(f"임시 파일 저장 완료: {file_path}")
+        # 파일 형식 확인 (확장자가 아니라 내용으로 판별, .xls는 정렬 엔진에서 읽을 수 없음)
+        file_format = detect_upload_format(file_path)
+        if file_format not in ('xlsx', 'csv', 'parquet'):
+            discard_upload(file_path)
+            return jsonify({'error': 'Excel(.xlsx), CSV, Parquet 파일만 업로드 가능합니다.'}), 400
         
-        try:
-            # Excel 처리
-            logger.info(f"Excel 처리 시작: {기준코드}")
-            if 기준코드 == 'P3':
-                processed_wb = process_excel_p3(file_path)
-            else:
-                processed_wb = process_excel_general(file_path, 기준코드)
-            
-            logger.info("Excel 처리 완료")
-            
-            # 결과 파일 저장
-            output_filename = f"정렬결과_{기준코드}_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            output_path = os.path.join(tempfile.gettempdir(), output_filename)
-            processed_wb.save(output_path)
-            
-            logger.info(f"결과 파일 저장 완료: {output_path}")
-            
-            # 임시 입력 파일 삭제
-            os.unlink(file_path)
-            logger.info("임시 입력 파일 삭제 완료")
-            
-            return jsonify({
-                'success': True,
-                'message': f'{기준코드} 정렬이 완료되었습니다. 파일명: {output_filename}',
-                'filename': output_filename,
-                'download_url': f'/api/meechul-download/{output_filename}'
-            })
-            
-        except Exception as e:
-            # 임시 파일 정리
-            if os.path.exists(file_path):
-                os.unlink(file_path)
-                logger.info("오류 발생으로 임시 파일 정리 완료")
-            logger.error(f"Excel 처리 중 오류: {e}")
-            raise e
-            
+        start_meechul_sweeper()
+        
+        # 바로 받기 모드: 결과 파일을 서버에 남기지 않고 응답 본문으로 전송
+        if stream:
+            return stream_meechul_result(file_path, 기준코드, engine)
+        
+        # 백그라운드 작업 모드: 작업 ID를 바로 반환하고 /api/jobs/<job_id>로 진행률 조회
+        if request.form.get('async') in ('1', 'true'):
+            job = submit_excel_job('meechul', session['user']['id'], process, file_path, 기준코드, engine)
+            if job is None:
+                discard_upload(file_path)
+                return jsonify({'error': '처리 대기 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.'}), 503
+            return jsonify(excel_job_response(job)), 202
+        
+        return jsonify(process(file_path, 기준코드, engine))
+    
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         logger.error(f"미출대응 처리 에러: {e}")
         return jsonify({'error': f'파일 처리 중 오류가 발생했습니다: {str(e)}'}), 500
 
+@app.route('/api/admin/meechul-cache', methods=['GET'])
+@admin_required
+def get_meechul_cache_stats():
+    """미출대응 결과 캐시 현황 (적중/미스/삭제 횟수, 사용 용량)"""
+    with meechul_cache_lock:
+        evict_meechul_cache()
+        lookups = meechul_cache_stats['hits'] + meechul_cache_stats['misses']
+        return jsonify({
+            'hits': meechul_cache_stats['hits'],
+            'misses': meechul_cache_stats['misses'],
+            'evictions': meechul_cache_stats['evictions'],
+            'swept': meechul_cache_stats['swept'],
+            'hit_rate': round(meechul_cache_stats['hits'] / lookups, 3) if lookups else 0,
+            'entries': len(meechul_cache),
+            'total_bytes': sum(v['size'] for v in meechul_cache.values()),
+            'max_bytes': MEECHUL_CACHE_MAX_BYTES,
+            'max_age_seconds': MEECHUL_CACHE_MAX_AGE
+        })
+
+@app.route('/api/admin/supabase-stats', methods=['GET'])
+@admin_required
+def get_supabase_stats():
+    """라우트별 Supabase 호출 현황 (요청당 평균 호출 수/시간, 최대 시간), 누적 시간이 큰 라우트부터"""
+    with supabase_stats_lock:
+        routes = [
+            {
+                'route': route,
+                'requests': stats['requests'],
+                'calls': stats['calls'],
+                'calls_per_request': round(stats['calls'] / stats['requests'], 2),
+                'avg_ms': round(stats['total_ms'] / stats['requests'], 1),
+                'max_ms': round(stats['max_ms'], 1),
+                'total_ms': round(stats['total_ms'], 1)
+            }
+            for route, stats in supabase_route_stats.items()
+        ]
+    routes.sort(key=lambda r: r['total_ms'], reverse=True)
+    return jsonify({
+        'routes': routes,
+        'pool_size': SUPABASE_POOL_SIZE,
+        'timeout_seconds': SUPABASE_TIMEOUT
+    })
+
 @app.route('/api/meechul-test')
+@admin_required
 def meechul_test():
     """미출대응 기능 테스트용 엔드포인트"""
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    if session['user'].get('role') != 'admin':
-        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
     try:
         # 테스트용 간단한 Excel 파일 생성
         wb = openpyxl.Workbook()
@@ -1363,6 +1627,7 @@ def meechul_test():
         test_filename = f"테스트파일_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}.xlsx"
         test_path = os.path.join(tempfile.gettempdir(), test_filename)
         wb.save(test_path)
+        start_meechul_sweeper()
         
         return jsonify({
             'success': True,
@@ -1376,15 +1641,9 @@ def meechul_test():
         return jsonify({'error': f'테스트 파일 생성 중 오류가 발생했습니다: {str(e)}'}), 500
 
 @app.route('/api/meechul-download/<filename>')
+@admin_required
 def meechul_download(filename):
     """미출대응 처리 결과 파일 다운로드"""
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요합니다.'}), 401
-    
-    # 관리자 권한 확인
-    if session['user'].get('role') != 'admin':
-        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
     try:
         file_path = os.path.join(tempfile.gettempdir(), filename)
         if not os.path.exists(file_path):
@@ -1401,26 +1660,22 @@ def meechul_download(filename):
         logger.error(f"파일 다운로드 에러: {e}")
         return jsonify({'error': '파일 다운로드 중 오류가 발생했습니다.'}), 500
 
-@app.route('/api/process-missing-response', methods=['POST'])
-def process_missing_response():
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_excel_job(job_id):
+    """백그라운드 Excel 처리 작업 상태/진행률 조회"""
     if 'user' not in session:
         return jsonify({'error': '로그인이 필요합니다.'}), 401
     
-    # 관리자 권한 확인
-    username = session['user']['username']
-    if username != 'admin':
-        try:
-            user_info = supabase.table('users').select('*').eq('id', session['user']['id']).execute()
-            if not user_info.data or user_info.data[0]['role'] != 'admin':
-                return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-        except:
-            return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
-    
+    with excel_jobs_lock:
+        job = excel_jobs.get(job_id)
+        if not job or job['owner'] != session['user']['id']:
+            return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+        return jsonify(excel_job_response(job))
+
+@app.route('/api/process-missing-response', methods=['POST'])
+@admin_required
+def process_missing_response():
     try:
-        import pandas as pd
-        import os
-        from werkzeug.utils import secure_filename
-        
         # 파일 업로드 확인
         if 'file' not in request.files:
             return jsonify({
@@ -1437,64 +1692,48 @@ def process_missing_response():
                 'message': '파일이 선택되지 않았습니다.'
             }), 400
         
-        # 파일 확장자 확인
-        if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        # 파일 타입 확인
+        if file_type not in MISSING_RESPONSE_TYPES:
             return jsonify({
                 'success': False,
-                'message': 'Excel 파일(.xlsx, .xls)만 업로드 가능합니다.'
+                'message': '잘못된 파일 타입입니다.'
             }), 400
         
-        # 파일 저장
-        filename = secure_filename(file.filename)
-        upload_dir = os.path.join(os.getcwd(), 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
-        
-        logger.info(f"파일 업로드 완료: {filename}, 타입: {file_type}")
+        # 요청을 받으면서 메모리(크면 고유 이름의 임시 파일)에 받아 둔 업로드를 그대로 사용
+        file_path = take_upload(file)
         
-        # 엑셀 파일 읽기
-        try:
-            df = pd.read_excel(file_path)
-            logger.info(f"엑셀 파일 읽기 성공: {len(df)} 행")
-        except Exception as e:
-            logger.error(f"엑셀 파일 읽기 실패: {e}")
+        # 파일 형식 확인 (확장자가 아니라 내용으로 판별)
+        if detect_upload_format(file_path) is None:
+            discard_upload(file_path)
             return jsonify({
                 'success': False,
-                'message': f'엑셀 파일 읽기에 실패했습니다: {str(e)}'
-            }), 500
-        
-        # 파일 타입에 따른 처리
-        result = []
-        
-        if file_type == 'b-building':
-            # B동전용 처리
-            result = process_b_building_data(df)
-        elif file_type == 'a-ground':
-            # A동지상 (P2) 처리
-            result = process_a_ground_data(df)
-        elif file_type == 'a-basement':
-            # A동지하 (P1) 처리
-            result = process_a_basement_data(df)
-        else:
-            return jsonify({
-                'success': False,
-                'message': '잘못된 파일 타입입니다.'
+                'message': 'Excel(.xlsx, .xls), CSV, Parquet 파일만 업로드 가능합니다.'
             }), 400
         
-        # 임시 파일 삭제
-        try:
-            os.remove(file_path)
-        except:
-            pass
+        logger.info(f"파일 업로드 완료: {file.filename}, 타입: {file_type}")
         
-        return jsonify({
-            'success': True,
-            'message': f'{len(result)}개의 항목이 정렬되었습니다.',
-            'result': result
-        })
+        # 백그라운드 작업 모드: 작업 ID를 바로 반환하고 /api/jobs/<job_id>로 진행률 조회
+        if request.form.get('async') in ('1', 'true'):
+            job = submit_excel_job('missing-response', session['user']['id'], run_missing_response,
+                                   file_path, file_type, session['user']['id'])
+            if job is None:
+                discard_upload(file_path)
+                return jsonify({
+                    'success': False,
+                    'message': '처리 대기 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.'
+                }), 503
+            return jsonify(excel_job_response(job)), 202
         
+        try:
+            return jsonify(run_missing_response(file_path, file_type, session['user']['id']))
+        except ExcelReadError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 500
+    
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         logger.error(f"미출대응 파일 처리 에러: {e}")
         return jsonify({
@@ -1502,87 +1741,287 @@ def process_missing_response():
             'message': f'파일 처리 중 오류가 발생했습니다: {str(e)}'
         }), 500
 
-def process_b_building_data(df):
-    """B동전용 데이터 처리"""
+def run_missing_response(file_path, file_type, owner_id, progress=None):
+    """업로드 파일을 정렬해 결과는 결과 파일로 보관하고, 첫 페이지와 이어 받기 주소를 반환한 뒤 임시 파일을 정리"""
     try:
-        # 기본 정렬 (첫 번째 컬럼 기준)
-        df_sorted = df.sort_values(df.columns[0])
-        
-        result = []
-        for index, row in df_sorted.iterrows():
-            result.append({
-                'productCode': str(row.iloc[0]) if len(row) > 0 else '',
-                'productName': str(row.iloc[1]) if len(row) > 1 else '',
-                'quantity': str(row.iloc[2]) if len(row) > 2 else '',
-                'location': 'B동'
-            })
+        expire_missing_response_results()
+        result_id = uuid.uuid4().hex
+        total, items, timings = run_in_excel_process(sort_missing_response_to_file, file_path, file_type, owner_id,
+                                                     missing_response_result_path(result_id),
+                                                     MISSING_RESPONSE_PAGE_SIZE, progress=progress)
         
-        return result
-    except Exception as e:
-        logger.error(f"B동 데이터 처리 에러: {e}")
-        return []
+        return {
+            'success': True,
+            'message': f'{total}개의 항목이 정렬되었습니다.',
+            'result': items,
+            'total': total,
+            'result_id': result_id,
+            'next_cursor': len(items) if len(items) < total else None,
+            'page_url': f'/api/missing-response/results/{result_id}',
+            'stream_url': f'/api/missing-response/results/{result_id}/stream',
+            'timings': timings
+        }
+    finally:
+        # 임시 파일 삭제
+        try:
+            discard_upload(file_path)
+        except:
+            pass
 
-def process_a_ground_data(df):
-    """A동지상 (P2) 데이터 처리"""
-    try:
-        # P2 컬럼 찾기 (컬럼명에 'P2'가 포함된 컬럼)
-        p2_column = None
-        for col in df.columns:
-            if 'P2' in str(col):
-                p2_column = col
-                break
-        
-        if p2_column is None:
-            # P2 컬럼이 없으면 두 번째 컬럼 사용
-            p2_column = df.columns[1] if len(df.columns) > 1 else df.columns[0]
-        
-        # P2 기준으로 정렬
-        df_sorted = df.sort_values(p2_column)
-        
-        result = []
-        for index, row in df_sorted.iterrows():
-            result.append({
-                'productCode': str(row.iloc[0]) if len(row) > 0 else '',
-                'productName': str(row.iloc[1]) if len(row) > 1 else '',
-                'quantity': str(row.iloc[2]) if len(row) > 2 else '',
-                'location': 'A동지상(P2)'
-            })
-        
-        return result
-    except Exception as e:
-        logger.error(f"A동지상 데이터 처리 에러: {e}")
-        return []
+# 미출대응 정렬 결과 보관 (응답에는 첫 페이지만 담고 나머지는 커서 페이지/NDJSON 스트림으로 조회)
+# 결과는 프로세스 메모리가 아니라 임시 디렉터리의 결과 파일에 두므로 결과 크기/개수만큼 메모리가 늘지 않고,
+# 같은 서버의 다른 gunicorn 워커로 간 페이지/스트림 요청도 같은 파일을 읽는다 (보관 기간은 EXCEL_JOB_RETENTION)
+MISSING_RESPONSE_PAGE_SIZE = int(os.getenv('MISSING_RESPONSE_PAGE_SIZE', '200'))
+MISSING_RESPONSE_MAX_PAGE_SIZE = 1000
+MISSING_RESPONSE_RESULT_PREFIX = '미출대응정렬_'
+MISSING_RESPONSE_STREAM_CHUNK = 64 * 1024
+
+def missing_response_result_path(result_id):
+    return os.path.join(tempfile.gettempdir(), f"{MISSING_RESPONSE_RESULT_PREFIX}{result_id}.ndjson")
+
+def expire_missing_response_results(now=None):
+    """보관 기간이 지난 결과 파일과 위치 색인 삭제 (중단된 .part 파일은 결과 파일 정리 스레드가 삭제)"""
+    now = now or time.time()
+    tmp_dir = tempfile.gettempdir()
+    for name in os.listdir(tmp_dir):
+        if not (name.startswith(MISSING_RESPONSE_RESULT_PREFIX) and name.endswith('.ndjson')):
+            continue
+        path = os.path.join(tmp_dir, name)
+        try:
+            if now - os.path.getmtime(path) > EXCEL_JOB_RETENTION:
+                os.remove(path)
+                os.remove(f"{path}.idx")
+        except OSError:
+            pass
 
-def process_a_basement_data(df):
-    """A동지하 (P1) 데이터 처리"""
+def get_missing_response_result(result_id, owner_id):
+    """요청한 사용자가 만든 보관 결과의 (결과 파일 경로, 항목 수) (없거나 만료되었으면 None)"""
+    if not (len(result_id) == 32 and all(c in '0123456789abcdef' for c in result_id)):
+        return None
+    path = missing_response_result_path(result_id)
     try:
-        # P1 컬럼 찾기 (컬럼명에 'P1'이 포함된 컬럼)
-        p1_column = None
-        for col in df.columns:
-            if 'P1' in str(col):
-                p1_column = col
-                break
-        
-        if p1_column is None:
-            # P1 컬럼이 없으면 첫 번째 컬럼 사용
-            p1_column = df.columns[0]
-        
-        # P1 기준으로 정렬
-        df_sorted = df.sort_values(p1_column)
-        
-        result = []
-        for index, row in df_sorted.iterrows():
-            result.append({
-                'productCode': str(row.iloc[0]) if len(row) > 0 else '',
-                'productName': str(row.iloc[1]) if len(row) > 1 else '',
-                'quantity': str(row.iloc[2]) if len(row) > 2 else '',
-                'location': 'A동지하(P1)'
-            })
+        if time.time() - os.path.getmtime(path) > EXCEL_JOB_RETENTION:
+            return None
+        meta = read_missing_response_meta(path)
+    except OSError:
+        return None
+    if meta['owner'] != owner_id:
+        return None
+    return path, meta['total']
+
+def parse_missing_response_cursor():
+    """요청의 cursor/limit 값 검증 (잘못된 값이면 ValueError)"""
+    cursor = int(request.args.get('cursor', 0))
+    limit = min(int(request.args.get('limit', MISSING_RESPONSE_PAGE_SIZE)), MISSING_RESPONSE_MAX_PAGE_SIZE)
+    if cursor < 0 or limit <= 0:
+        raise ValueError('cursor와 limit은 0 이상이어야 합니다.')
+    return cursor, limit
+
+@app.route('/api/missing-response/results/<result_id>', methods=['GET'])
+def get_missing_response_page(result_id):
+    """보관된 미출대응 정렬 결과를 커서 페이지 단위로 조회"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요합니다.'}), 401
+    
+    result = get_missing_response_result(result_id, session['user']['id'])
+    if result is None:
+        return jsonify({'error': '정렬 결과를 찾을 수 없습니다. 파일을 다시 처리해주세요.'}), 404
+    path, total = result
+    
+    try:
+        cursor, limit = parse_missing_response_cursor()
+    except ValueError:
+        return jsonify({'error': '올바르지 않은 cursor 또는 limit 값입니다.'}), 400
+    
+    try:
+        items = read_missing_response_page(path, cursor, limit)
+    except OSError:
+        return jsonify({'error': '정렬 결과를 찾을 수 없습니다. 파일을 다시 처리해주세요.'}), 404
+    return jsonify({
+        'items': items,
+        'total': total,
+        'next_cursor': cursor + len(items) if cursor + len(items) < total else None
+    })
+
+@app.route('/api/missing-response/results/<result_id>/stream', methods=['GET'])
+def stream_missing_response_result(result_id):
+    """보관된 미출대응 정렬 결과를 cursor부터 NDJSON(한 줄에 한 항목)으로 스트리밍 (결과 파일 내용을 그대로 전송)"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요합니다.'}), 401
+    
+    result = get_missing_response_result(result_id, session['user']['id'])
+    if result is None:
+        return jsonify({'error': '정렬 결과를 찾을 수 없습니다. 파일을 다시 처리해주세요.'}), 404
+    path = result[0]
+    
+    try:
+        cursor, _ = parse_missing_response_cursor()
+    except ValueError:
+        return jsonify({'error': '올바르지 않은 cursor 또는 limit 값입니다.'}), 400
+    
+    # 응답 전에 열어 두므로 전송 중에 보관 기간이 지나 파일이 삭제되어도 끝까지 전송
+    try:
+        f = open(path, 'rb')
+        f.seek(missing_response_offset(path, cursor))
+    except OSError:
+        return jsonify({'error': '정렬 결과를 찾을 수 없습니다. 파일을 다시 처리해주세요.'}), 404
+    
+    def generate():
+        with f:
+            while True:
+                chunk = f.read(MISSING_RESPONSE_STREAM_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# 미출대응 일괄 처리 (건물별 파일 여러 개를 한 요청으로 받아 프로세스 풀에서 동시에 정렬)
+MISSING_RESPONSE_BATCH_MAX_FILES = 10
+def run_missing_response_batch(uploads, owner_id, workbook=False, progress=None):
+    """업로드 파일 목록((파일명, 업로드, 타입))을 동시에 정렬해 파일별 결과를 모아 반환
+
+    각 파일은 run_missing_response로 처리하므로 전체 처리 시간은 합계가 아니라 가장 느린 파일(과 프로세스 풀 크기)에 맞춰진다.
+    한 파일이 실패해도 나머지 결과는 반환하고, workbook이면 성공한 파일을 건물별 시트로 묶은 결과 파일도 만든다.
+    결과 파일을 만들 수 없으면(정렬 결과 만료 등) 빈 시트를 쓰지 않고 workbook_error에 사유를 담는다.
+    """
+    start = time.perf_counter()
+    file_progress = [{'rows_read': 0, 'groups_built': 0, 'rows_written': 0} for _ in uploads]
+    results = [None] * len(uploads)
+    
+    with ThreadPoolExecutor(max_workers=len(uploads), thread_name_prefix='missing-response-batch') as executor:
+        futures = {
+            executor.submit(run_missing_response, file_path, file_type, owner_id, progress=file_progress[idx]): idx
+            for idx, (_, file_path, file_type) in enumerate(uploads)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5)
+            for future in done:
+                idx = futures[future]
+                filename, _, file_type = uploads[idx]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"일괄 처리 파일 실패 ({filename}): {e}")
+                    result = {'success': False, 'message': str(e)}
+                results[idx] = {'filename': filename, 'type': file_type, **result}
+            if progress is not None:
+                for key in progress:
+                    progress[key] = sum(p[key] for p in file_progress)
+    
+    succeeded = [r for r in results if r['success']]
+    response = {
+        'success': bool(succeeded),
+        'message': f"{len(uploads)}개 파일 중 {len(succeeded)}개 정렬 완료 (총 {sum(r['total'] for r in succeeded)}개 항목)",
+        'results': results
+    }
+    
+    if workbook and succeeded:
+        sheets = []
+        missing = []
+        for r in succeeded:
+            title = MISSING_RESPONSE_TYPES[r['type']][2]
+            # 같은 건물 파일이 여러 개면 시트 이름 뒤에 번호를 붙임
+            count = sum(1 for existing, _ in sheets if existing.split(' (')[0] == title)
+            stored = get_missing_response_result(r['result_id'], owner_id)
+            if stored is None:
+                missing.append(r['filename'])
+                continue
+            sheets.append((f"{title} ({count + 1})" if count else title, stored[0]))
+        
+        if missing:
+            response['workbook_error'] = f"정렬 결과가 만료되어 건물별 시트 엑셀을 만들지 못했습니다. ({', '.join(missing)})"
+            logger.warning(f"미출대응 일괄 처리: {response['workbook_error']}")
+        else:
+            output_filename = f"미출대응결과_{get_korean_datetime().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}.xlsx"
+            output_path = os.path.join(tempfile.gettempdir(), output_filename)
+            try:
+                run_in_excel_process(write_missing_response_workbook, sheets, output_path)
+                response['filename'] = output_filename
+                response['download_url'] = f'/api/meechul-download/{output_filename}'
+            except Exception as e:
+                logger.error(f"미출대응 건물별 시트 엑셀 생성 실패: {e}")
+                response['workbook_error'] = f"건물별 시트 엑셀을 만들지 못했습니다: {e}"
+    
+    response['timings'] = {'total': round(time.perf_counter() - start, 3)}
+    logger.info(f"미출대응 일괄 처리 완료: {response['message']}, {response['timings']['total']}초")
+    return response
+
+@app.route('/api/process-missing-response/batch', methods=['POST'])
+@admin_required
+def process_missing_response_batch():
+    """건물별 미출대응 파일 여러 개(file/type 쌍)를 한 번에 처리"""
+    try:
+        # 파일과 타입은 보낸 순서대로 짝을 지음
+        files = request.files.getlist('file')
+        file_types = request.form.getlist('type')
+        
+        if not files or any(file.filename == '' for file in files):
+            return jsonify({
+                'success': False,
+                'message': '파일이 선택되지 않았습니다.'
+            }), 400
+        
+        if len(files) != len(file_types):
+            return jsonify({
+                'success': False,
+                'message': '파일마다 타입을 지정해주세요.'
+            }), 400
+        
+        if len(files) > MISSING_RESPONSE_BATCH_MAX_FILES:
+            return jsonify({
+                'success': False,
+                'message': f'한 번에 최대 {MISSING_RESPONSE_BATCH_MAX_FILES}개 파일까지 처리할 수 있습니다.'
+            }), 400
         
-        return result
+        if any(file_type not in MISSING_RESPONSE_TYPES for file_type in file_types):
+            return jsonify({
+                'success': False,
+                'message': '잘못된 파일 타입입니다.'
+            }), 400
+        
+        uploads = [(file.filename, take_upload(file), file_type) for file, file_type in zip(files, file_types)]
+        
+        # 파일 형식 확인 (하나라도 읽을 수 없으면 전체 거부)
+        invalid = [filename for filename, file_path, _ in uploads if detect_upload_format(file_path) is None]
+        if invalid:
+            for _, file_path, _ in uploads:
+                discard_upload(file_path)
+            return jsonify({
+                'success': False,
+                'message': f"Excel(.xlsx, .xls), CSV, Parquet 파일만 업로드 가능합니다: {', '.join(invalid)}"
+            }), 400
+        
+        logger.info(f"미출대응 일괄 처리 시작: {[(filename, file_type) for filename, _, file_type in uploads]}")
+        
+        workbook = request.form.get('workbook') in ('1', 'true')
+        if workbook:
+            start_meechul_sweeper()
+        
+        # 백그라운드 작업 모드: 작업 ID를 바로 반환하고 /api/jobs/<job_id>로 진행률 조회
+        if request.form.get('async') in ('1', 'true'):
+            job = submit_excel_job('missing-response-batch', session['user']['id'], run_missing_response_batch,
+                                   uploads, session['user']['id'], workbook)
+            if job is None:
+                for _, file_path, _ in uploads:
+                    discard_upload(file_path)
+                return jsonify({
+                    'success': False,
+                    'message': '처리 대기 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.'
+                }), 503
+            return jsonify(excel_job_response(job)), 202
+        
+        return jsonify(run_missing_response_batch(uploads, session['user']['id'], workbook))
+    
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        logger.error(f"A동지하 데이터 처리 에러: {e}")
-        return []
+        logger.error(f"미출대응 일괄 처리 에러: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'파일 처리 중 오류가 발생했습니다: {str(e)}'
+        }), 500
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+미출대응 정렬 엔진 벤치마크 스크립트
+합성 미출 엑셀 파일을 생성해 엔진/기준코드별 처리 시간, 최대 메모리(RSS), 결과 파일 크기를 측정
+
+사용 예:
+    python bench_meechul.py
+    python bench_meechul.py --sizes 1000,10000 --engines python,pandas --criteria P1,P3
+    python bench_meechul.py --dup-ratio 0.5 --m-fill 0.3 --n-fill 0.1 --compare
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from queue import Empty
+from datetime import datetime, timezone, timedelta
+
+import openpyxl
+
+# 한국 시간대 (KST = UTC+9)
+KST = timezone(timedelta(hours=9))
+
+DEFAULT_SIZES = '1000,10000,100000,500000'
+DEFAULT_ENGINES = 'python,pandas'
+DEFAULT_CRITERIA = 'P1,P2,P3,ALL'
+DEFAULT_OUTPUT = 'bench_results.json'
+
+def get_korean_datetime():
+    """한국 시간 기준으로 현재 시간을 반환"""
+    return datetime.now(KST)
+
+def parse_mix(text):
+    """'P1:0.3,P2:0.3,P3:0.3' 형식의 기준코드 비율을 dict로 변환 (나머지는 기타 코드)"""
+    mix = {}
+    for part in text.split(','):
+        code, ratio = part.split(':')
+        mix[code.strip()] = float(ratio)
+    if sum(mix.values()) > 1:
+        raise ValueError('기준코드 비율의 합은 1 이하여야 합니다.')
+    return mix
+
+def generate_meechul_file(path, rows, mix, dup_ratio, m_fill, n_fill, seed=0):
+    """미출 엑셀과 같은 구조(헤더 2행 + A~P열)의 합성 파일을 생성
+
+    - B열(상품코드): dup_ratio 비율의 행이 이미 나온 상품코드를 다시 사용
+    - M/N열(수량): m_fill/n_fill 비율의 행에 0이 아닌 값을 채움
+    - O열(위치코드): mix 비율에 따라 P1/P2/P3, 나머지는 기타 코드
+    """
+    rnd = random.Random(seed)
+    codes = list(mix)
+    weights = list(mix.values())
+    other = max(0.0, 1 - sum(weights))
+    codes.append('X9')
+    weights.append(other)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('미출')
+    ws.append(['순번', '상품코드', '상품명', '주문수량', '출고수량', '단위', '단가', '거래처', '주문번호',
+               '주문일자', '출고일자', '비고', '미출수량', '재고수량', '위치코드', '담당'])
+    ws.append([None] * 16)
+
+    keys = []
+    for i in range(rows):
+        if keys and rnd.random() < dup_ratio:
+            key = rnd.choice(keys)
+        else:
+            key = f"ITEM{len(keys):07d}"
+            keys.append(key)
+
+        code = rnd.choices(codes, weights)[0] + rnd.choice('ABCDE') + f"{rnd.randint(1, 40):02d}"
+        m = rnd.randint(1, 50) if rnd.random() < m_fill else rnd.choice([0, None])
+        n = rnd.randint(1, 50) if rnd.random() < n_fill else rnd.choice([0, None])
+        ws.append([i + 1, key, f"상품{key[-4:]}", rnd.randint(1, 100), 0, 'EA', 1000,
+                   f"거래처{rnd.randint(1, 200)}", f"ORD{i:08d}", '2024-01-15', None, None,
+                   m, n, code, rnd.choice([None, '담당자'])])
+
+    wb.save(path)
+
+def run_case(input_path, criteria, engine, output_path, queue):
+    """새 프로세스에서 엔진 1회를 실행하고 (처리 시간, 최대 RSS) 측정 결과를 queue로 전달"""
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import excel_engine
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    try:
+        if criteria == 'ALL':
+            wb = excel_engine.process_excel_all(input_path, engine)
+        elif criteria == 'P3':
+            wb = excel_engine.process_excel_p3(input_path, engine)
+        else:
+            wb = excel_engine.process_excel_general(input_path, criteria, engine)
+        wb.save(output_path)
+    except Exception as e:
+        queue.put({'error': str(e)})
+        return
+
+    queue.put({
+        'seconds': round(time.perf_counter() - start, 3),
+        # Linux의 ru_maxrss는 KB 단위
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'import_rss_mb': round(baseline_rss / 1024, 1)
+    })
+
+def measure(input_path, criteria, engine, workdir):
+    """엔진 1회 실행 결과를 측정 (이전 실행의 메모리가 섞이지 않도록 매번 새 프로세스)"""
+    output_path = os.path.join(workdir, f"result_{criteria}_{engine}.xlsx")
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=run_case, args=(input_path, criteria, engine, output_path, queue))
+    proc.start()
+
+    # 측정 프로세스가 결과를 보내지 못하고 죽으면(메모리 부족으로 강제 종료, import 실패 등) 기다리지 않고 오류로 기록
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if proc.is_alive():
+                continue
+            try:
+                # 종료 직전에 보낸 결과가 아직 큐에 남아 있을 수 있음
+                result = queue.get(timeout=1)
+            except Empty:
+                result = {'error': f'측정 프로세스가 결과 없이 종료되었습니다. (exit code {proc.exitcode})'}
+            break
+    proc.join()
+
+    if 'error' not in result:
+        result['output_bytes'] = os.path.getsize(output_path)
+        os.remove(output_path)
+    return result
+
+def git_revision():
+    """현재 커밋 해시 (git 저장소가 아니면 None)"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path):
+    """이전 벤치마크 실행 기록을 읽음 (없으면 빈 목록)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def print_comparison(previous, current):
+    """같은 조건(행 수/기준코드/엔진)의 이전 실행과 처리 시간·메모리 비교 출력"""
+    old = {(r['rows'], r['criteria'], r['engine']): r for r in previous['results'] if 'error' not in r}
+    print(f"\n📊 이전 실행({previous['revision']}, {previous['timestamp']})과 비교")
+    for r in current['results']:
+        prev = old.get((r['rows'], r['criteria'], r['engine']))
+        if prev is None or 'error' in r:
+            continue
+        print(f"   {r['rows']:>7}행 {r['criteria']:<3} {r['engine']:<6} "
+              f"시간 {prev['seconds']:.2f}s → {r['seconds']:.2f}s ({r['seconds'] / prev['seconds']:.2f}x), "
+              f"RSS {prev['peak_rss_mb']}MB → {r['peak_rss_mb']}MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='미출대응 정렬 엔진 벤치마크')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'데이터 행 수 목록 (기본: {DEFAULT_SIZES})')
+    parser.add_argument('--engines', default=DEFAULT_ENGINES, help=f'정렬 엔진 목록 (기본: {DEFAULT_ENGINES})')
+    parser.add_argument('--criteria', default=DEFAULT_CRITERIA, help=f'기준코드 목록 (기본: {DEFAULT_CRITERIA})')
+    parser.add_argument('--mix', default='P1:0.25,P2:0.25,P3:0.4', help='기준코드 비율 (나머지는 기타 코드)')
+    parser.add_argument('--dup-ratio', type=float, default=0.3, help='상품코드(B열) 중복 행 비율')
+    parser.add_argument('--m-fill', type=float, default=0.2, help='M열 값(0 아님) 비율')
+    parser.add_argument('--n-fill', type=float, default=0.1, help='N열 값(0 아님) 비율')
+    parser.add_argument('--seed', type=int, default=0, help='난수 시드')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'결과 기록 파일 (기본: {DEFAULT_OUTPUT})')
+    parser.add_argument('--compare', action='store_true', help='결과 파일의 직전 실행과 비교 출력')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from excel_engine import MEECHUL_ENGINES
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    engines = args.engines.split(',')
+    criteria_list = args.criteria.split(',')
+    mix = parse_mix(args.mix)
+
+    for engine in engines:
+        if engine not in MEECHUL_ENGINES:
+            print(f"❌ 지원하지 않는 엔진입니다: {engine} (가능: {', '.join(MEECHUL_ENGINES)})")
+            return False
+    for criteria in criteria_list:
+        if criteria not in ('P1', 'P2', 'P3', 'ALL'):
+            print(f"❌ 잘못된 기준코드입니다: {criteria}")
+            return False
+
+    print("🔄 미출대응 엔진 벤치마크 시작...")
+    run = {
+        'timestamp': get_korean_datetime().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'openpyxl': openpyxl.__version__,
+        'params': {
+            'mix': mix,
+            'dup_ratio': args.dup_ratio,
+            'm_fill': args.m_fill,
+            'n_fill': args.n_fill,
+            'seed': args.seed
+        },
+        'results': []
+    }
+
+    with tempfile.TemporaryDirectory(prefix='bench_meechul_') as workdir:
+        for rows in sizes:
+            input_path = os.path.join(workdir, f"input_{rows}.xlsx")
+            start = time.perf_counter()
+            generate_meechul_file(input_path, rows, mix, args.dup_ratio, args.m_fill, args.n_fill, args.seed)
+            print(f"📄 {rows}행 합성 파일 생성 ({time.perf_counter() - start:.1f}s, "
+                  f"{os.path.getsize(input_path) / 1024 / 1024:.1f}MB)")
+
+            for criteria in criteria_list:
+                for engine in engines:
+                    result = measure(input_path, criteria, engine, workdir)
+                    result.update({'rows': rows, 'criteria': criteria, 'engine': engine,
+                                   'input_bytes': os.path.getsize(input_path)})
+                    run['results'].append(result)
+
+                    if 'error' in result:
+                        print(f"   ❌ {criteria:<3} {engine:<6} 오류: {result['error']}")
+                    else:
+                        print(f"   ✅ {criteria:<3} {engine:<6} {result['seconds']:>8.2f}s  "
+                              f"RSS {result['peak_rss_mb']:>7.1f}MB  결과 {result['output_bytes'] / 1024:>9.1f}KB")
+
+            os.remove(input_path)
+
+    history = load_history(args.output)
+    if args.compare and history:
+        print_comparison(history[-1], run)
+
+    history.append(run)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ 벤치마크 결과 저장: {args.output}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
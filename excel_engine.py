@@ -0,0 +1,755 @@
+"""
+WorkTracker 엑셀 처리 엔진 (excel_engine.py)
+업로드 파일(xlsx/csv/parquet) 읽기, 미출대응 정렬/결과 파일 작성, 프로세스 풀 워커 진입점
+
+프로세스 풀 워커는 이 모듈만 import하므로 Flask 앱, 저장소(DB 연결) 등 부수 효과가 있는 모듈을 import하지 않는다.
+"""
+
+import os
+import io
+import csv
+import time
+import uuid
+import json
+import codecs
+import signal
+import hashlib
+import logging
+from array import array
+from itertools import accumulate
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+import pandas as pd
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 업로드 파일 형식 (확장자가 아니라 파일 앞부분 내용으로 판별)
+UPLOAD_FORMAT_SIGNATURES = (
+    (b'PK\x03\x04', 'xlsx'),
+    (b'\xd0\xcf\x11\xe0', 'xls'),
+    (b'PAR1', 'parquet'),
+)
+UPLOAD_SNIFF_BYTES = 64 * 1024
+
+def open_upload(file_path):
+    """업로드 내용(임시 파일 경로 또는 bytes)을 읽기용 바이너리 파일 객체로 열기"""
+    if isinstance(file_path, bytes):
+        return io.BytesIO(file_path)
+    return open(file_path, 'rb')
+
+def detect_csv_encoding(head):
+    """CSV 앞부분이 읽히는 인코딩 반환 (UTF-8(BOM 포함) 우선, 다음 CP949, 둘 다 아니면 None)"""
+    for encoding in ('utf-8-sig', 'cp949'):
+        try:
+            # 앞부분만 읽으므로 끝에서 잘린 멀티바이트 문자는 오류로 보지 않음
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def detect_upload_format(file_path):
+    """업로드 파일 형식(xlsx/xls/parquet/csv)을 내용으로 판별 (알 수 없는 형식이면 None)"""
+    with open_upload(file_path) as f:
+        head = f.read(UPLOAD_SNIFF_BYTES)
+
+    for signature, file_format in UPLOAD_FORMAT_SIGNATURES:
+        if head.startswith(signature):
+            return file_format
+
+    # 텍스트 파일 중 첫 줄이 쉼표로 구분된 경우만 CSV로 인정
+    if b'\x00' not in head and b',' in head.split(b'\n', 1)[0] and detect_csv_encoding(head):
+        return 'csv'
+    return None
+
+def csv_cell_value(text):
+    """CSV 문자열을 엑셀 셀과 같은 값으로 변환 (빈 칸→None, 정규 표기 숫자→int/float, 나머지는 문자열)
+
+    '007'처럼 다시 문자열로 바꿨을 때 원문과 달라지는 값은 엑셀에서 텍스트로 저장된 값으로 보고 그대로 둔다.
+    """
+    if text == '':
+        return None
+    if text[0] in '-0123456789.':
+        try:
+            number = int(text)
+            return number if str(number) == text else text
+        except ValueError:
+            pass
+        try:
+            number = float(text)
+            return number if repr(number) == text else text
+        except ValueError:
+            pass
+    return text
+
+def iter_upload_rows(file_path):
+    """업로드 파일(임시 파일 경로 또는 bytes)의 모든 행(헤더 포함)을 값 튜플로 순회
+
+    - xlsx: openpyxl 읽기 전용 모드
+    - csv: csv 모듈 (zip/XML 해석 없이 읽음)
+    - parquet: 열 이름을 첫 행으로, 이후 데이터 행 (보관용으로 내보낸 파일)
+      결측값 때문에 실수형이 된 정수 열은 엑셀에서 읽은 값과 같도록 정수로 되돌림
+    """
+    file_format = detect_upload_format(file_path)
+
+    if file_format == 'xlsx':
+        wb = openpyxl.load_workbook(open_upload(file_path), read_only=True)
+        try:
+            # 읽기 전용 모드는 시트의 <dimension> 태그를 그대로 믿으므로 (잘못 기록된 파일은 열/행이 잘림) 다시 계산
+            ws = wb.active
+            ws.reset_dimensions()
+            yield from ws.iter_rows(values_only=True)
+        finally:
+            wb.close()
+
+    elif file_format == 'csv':
+        with open_upload(file_path) as f:
+            encoding = detect_csv_encoding(f.read(UPLOAD_SNIFF_BYTES))
+            f.seek(0)
+            for row in csv.reader(io.TextIOWrapper(f, encoding=encoding, newline='')):
+                yield tuple(csv_cell_value(text) for text in row)
+
+    elif file_format == 'parquet':
+        with open_upload(file_path) as f:
+            df = pd.read_parquet(f)
+        yield tuple(str(col) for col in df.columns)
+        df = df.astype(object).where(df.notna(), None)
+        for row in df.itertuples(index=False, name=None):
+            yield tuple(int(value) if isinstance(value, float) and value.is_integer() else value
+                        for value in row)
+
+    else:
+        raise ValueError('지원하지 않는 파일 형식입니다. (xlsx, csv, parquet만 가능)')
+
+def load_meechul_rows(file_path, progress=None):
+    """미출대응 파일(xlsx/csv/parquet)을 한 번만 읽어 (헤더 2행, 데이터 행 튜플 목록, 열 수)를 반환"""
+    header_rows = []
+    data_rows = []
+    last_col = 0
+
+    for row in iter_upload_rows(file_path):
+        if len(row) > last_col:
+            last_col = len(row)
+        if len(header_rows) < 2:
+            header_rows.append(row)
+        else:
+            data_rows.append(row)
+            if progress is not None and len(data_rows) % 5000 == 0:
+                progress['rows_read'] = len(data_rows)
+
+    if progress is not None:
+        progress['rows_read'] = len(data_rows)
+
+    while len(header_rows) < 2:
+        header_rows.append(())
+
+    header_rows = [row + (None,) * (last_col - len(row)) for row in header_rows]
+
+    # 짧은 행은 O열(기준코드)까지 접근할 수 있도록 None으로 채움
+    width = max(last_col, 15)
+    for idx, row in enumerate(data_rows):
+        if len(row) < width:
+            data_rows[idx] = row + (None,) * (width - len(row))
+
+    return header_rows, data_rows, last_col
+
+# 미출대응 결과 시트 공통 스타일 (행/셀마다 새로 만들지 않고 공유)
+MEECHUL_YELLOW_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+MEECHUL_PINK_FILL = PatternFill(start_color="FFC0CB", end_color="FFC0CB", fill_type="solid")
+MEECHUL_RED_BOLD = Font(color="FF0000", bold=True)
+MEECHUL_CENTER_ALIGN = Alignment(horizontal="center", vertical="center")
+
+# 미출대응 정렬 엔진 (python: 기본 dict 기반, pandas: 열 단위 벡터 연산)
+MEECHUL_ENGINES = ('python', 'pandas')
+
+def plan_meechul_groups(group_array):
+    """정렬된 그룹마다 (행 목록, M 강조, N 강조, M 병합, N 병합) 출력 계획을 생성"""
+    plan = []
+    for _, _, rows in group_array:
+        m_high = any(row[12] not in [None, 0, ''] for row in rows)
+        n_high = any(row[13] not in [None, 0, ''] for row in rows)
+        m_merge = all(row[12] == rows[0][12] for row in rows)
+        n_merge = all(row[13] == rows[0][13] for row in rows)
+        plan.append((rows, m_high, n_high, m_merge, n_merge))
+    return plan
+
+def meechul_frame(data_rows):
+    """행 튜플을 값 변환 없이 object dtype DataFrame으로 적재"""
+    return pd.DataFrame(data_rows, dtype=object)
+
+def plan_meechul_groups_pandas(df, data_rows, 기준코드):
+    """pandas 열 연산으로 기준코드 필터, P1/P2 제외, M/N 강조·병합, 중복 표시, 안정 정렬을 계산해 출력 계획을 생성"""
+    if df.empty:
+        return []
+
+    # str(None) == 'None'과 같도록 결측값을 문자열로 채움 (pandas 문자열 dtype 대비)
+    keys = df[1].astype(str).fillna('None')
+    codes = df[14].astype(str).fillna('None')
+
+    if 기준코드 == 'P3':
+        p1p2 = codes.str.startswith('P1') | codes.str.startswith('P2')
+        mask = codes.str.startswith('P3') & ~keys.isin(keys[p1p2].unique())
+    else:
+        mask = codes.str.startswith(기준코드)
+
+    positions = np.flatnonzero(mask.to_numpy())
+    if len(positions) == 0:
+        return []
+
+    # B열 키 첫 등장 순서의 그룹 번호
+    group_ids, _ = pd.factorize(keys.to_numpy()[positions])
+    sizes = np.bincount(group_ids)
+    first_rows = np.unique(group_ids, return_index=True)[1]
+
+    def group_flags(values):
+        empty = pd.isna(values) | (values == 0) | (values == '')
+        high = np.bincount(group_ids, weights=~empty, minlength=len(sizes)) > 0
+        same = values == values[first_rows][group_ids]
+        merge = np.bincount(group_ids, weights=~same, minlength=len(sizes)) == 0
+        return high, merge
+
+    m_high, m_merge = group_flags(df[12].to_numpy()[positions])
+    n_high, n_merge = group_flags(df[13].to_numpy()[positions])
+
+    # 그룹 첫 행의 기준코드 3번째 문자로 안정 정렬 (동률은 첫 등장 순서 유지)
+    기준문자 = codes.str[2:3].to_numpy()[positions][first_rows]
+    group_order = pd.Series(기준문자).sort_values(kind='stable').index
+
+    row_order = positions[np.argsort(group_ids, kind='stable')]
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+    plan = []
+    for g in group_order:
+        rows = [data_rows[i] for i in row_order[offsets[g]:offsets[g + 1]]]
+        plan.append((rows, bool(m_high[g]), bool(n_high[g]), bool(m_merge[g]), bool(n_merge[g])))
+    return plan
+
+def write_meechul_sheet(result_ws, header_rows, plan, last_col, progress=None):
+    """정렬 계획을 쓰기 전용 시트에 스트리밍으로 기록 (공유 스타일, M/N 병합 범위 사전 계산)"""
+    # 공유 스타일 객체를 그대로 지정 (통합 문서가 동일 객체를 하나로 등록)
+    def styled_cell(value, fill=None, font=None):
+        cell = WriteOnlyCell(result_ws, value)
+        cell.alignment = MEECHUL_CENTER_ALIGN
+        if fill is not None:
+            cell.fill = fill
+        if font is not None:
+            cell.font = font
+        return cell
+
+    # 열 너비는 행을 기록할 위치를 정하는 같은 순회에서 함께 누적
+    # (쓰기 전용 모드에서는 첫 행을 기록하기 전에 열 너비를 지정해야 하므로 별도 재순회 없이 여기서 계산)
+    widths = [0] * last_col
+
+    def track_widths(row):
+        for idx, value in enumerate(row[:last_col]):
+            if value:
+                length = len(str(value))
+                if length > widths[idx]:
+                    widths[idx] = length
+
+    for row in header_rows:
+        track_widths(row)
+
+    # 1) 그룹별 M/N 병합 범위 (범위끼리 겹치지 않으므로 add()의 포함 검사 없이 한 번에 지정)
+    merged_ranges = []
+    result_row = 3
+    for rows, _, _, m_merge, n_merge in plan:
+        start = result_row
+        end = start + len(rows) - 1
+        for row in rows:
+            track_widths(row)
+
+        if m_merge:
+            merged_ranges.append(CellRange(min_col=13, min_row=start, max_col=13, max_row=end))
+        if n_merge:
+            merged_ranges.append(CellRange(min_col=14, min_row=start, max_col=14, max_row=end))
+
+        result_row = end + 1
+    result_ws.merged_cells = MultiCellRange(merged_ranges)
+
+    # 2) 누적된 열 너비 지정
+    for col in range(1, last_col + 1):
+        result_ws.column_dimensions[get_column_letter(col)].width = widths[col - 1] + 2
+
+    # 3) 헤더 2행과 정렬된 행을 순서대로 기록
+    for row in header_rows:
+        result_ws.append([styled_cell(value) for value in row[:last_col]])
+
+    # 진행률은 (프로세스 간 공유 dict일 수 있으므로) 일정 행 수마다만 갱신
+    written = progress['rows_written'] if progress is not None else 0
+    reported = written
+
+    for rows, m_high, n_high, m_merge, n_merge in plan:
+        duplicated = len(rows) > 1
+        for offset, row in enumerate(rows):
+            cells = [styled_cell(value) for value in row[:last_col]]
+            if duplicated:
+                cells[1] = styled_cell(row[1], fill=MEECHUL_PINK_FILL)
+            # 병합 범위의 첫 행 이후 셀은 값/서식 없이 비워 둠
+            if m_merge and offset > 0:
+                cells[12] = None
+            elif m_high:
+                cells[12] = styled_cell(row[12], MEECHUL_YELLOW_FILL, MEECHUL_RED_BOLD)
+            if n_merge and offset > 0:
+                cells[13] = None
+            elif n_high:
+                cells[13] = styled_cell(row[13], MEECHUL_YELLOW_FILL, MEECHUL_RED_BOLD)
+            result_ws.append(cells)
+
+        written += len(rows)
+        if progress is not None and written - reported >= 5000:
+            progress['rows_written'] = reported = written
+
+    if progress is not None:
+        progress['rows_written'] = written
+
+def sort_meechul_groups(group_dict):
+    """B열 기준 그룹을 기준코드 3번째 문자 순으로 안정 정렬해 (키, 기준문자, 행 목록) 목록으로 반환"""
+    group_array = []
+    for key, rows in group_dict.items():
+        기준문자 = str(rows[0][14])[2:3]
+        group_array.append((key, 기준문자, rows))
+    group_array.sort(key=lambda x: x[1])
+    return group_array
+
+def bucket_meechul_rows(data_rows):
+    """한 번의 순회로 P1/P2/P3 그룹을 나누고, P3는 P1/P2에 있는 B열 키를 제외"""
+    group_dicts = {'P1': {}, 'P2': {}, 'P3': {}}
+    p1p2_dict = {}
+
+    for row in data_rows:
+        prefix = str(row[14])[:2]
+        group_dict = group_dicts.get(prefix)
+        if group_dict is None:
+            continue
+        b = str(row[1])
+        group_dict.setdefault(b, []).append(row)
+        if prefix != 'P3':
+            p1p2_dict[b] = True
+
+    group_dicts['P3'] = {k: v for k, v in group_dicts['P3'].items() if k not in p1p2_dict}
+    return group_dicts
+
+def build_meechul_workbook(header_rows, sheets, last_col, progress=None):
+    """(시트명, 정렬 계획) 목록으로 쓰기 전용 결과 통합 문서를 생성"""
+    if progress is not None:
+        progress['groups_built'] = sum(len(plan) for _, plan in sheets)
+
+    new_wb = openpyxl.Workbook(write_only=True)
+    for title, plan in sheets:
+        result_ws = new_wb.create_sheet(title)
+        write_meechul_sheet(result_ws, header_rows, plan, last_col, progress)
+    return new_wb
+
+def plan_excel_p3(file_path, engine='python', progress=None):
+    """P3 정렬 계획 (중복 제거 포함): (헤더 2행, [(시트명, 정렬 계획)], 열 수)"""
+    logger.info(f"P3 처리 시작: {file_path} (엔진: {engine})")
+    
+    header_rows, data_rows, last_col = load_meechul_rows(file_path, progress)
+    last_row = len(header_rows) + len(data_rows)
+    
+    logger.info(f"Excel 파일 크기: {last_row}행 x {last_col}열")
+
+    if engine == 'pandas':
+        plan = plan_meechul_groups_pandas(meechul_frame(data_rows), data_rows, 'P3')
+        logger.info(f"정렬된 그룹 수: {len(plan)}")
+        return header_rows, [("정렬결과", plan)], last_col
+
+    p1p2_dict = {}
+    p3_dict = {}
+
+    for row in data_rows:
+        b = str(row[1])
+        type_code = str(row[14])
+        if type_code.startswith("P1") or type_code.startswith("P2"):
+            p1p2_dict[b] = True
+        elif type_code.startswith("P3"):
+            p3_dict.setdefault(b, []).append(row)
+
+    logger.info(f"P1/P2 항목 수: {len(p1p2_dict)}, P3 항목 수: {len(p3_dict)}")
+
+    filtered = {k: v for k, v in p3_dict.items() if k not in p1p2_dict}
+    logger.info(f"중복 제거 후 P3 항목 수: {len(filtered)}")
+
+    group_array = sort_meechul_groups(filtered)
+    
+    logger.info(f"정렬된 그룹 수: {len(group_array)}")
+
+    return header_rows, [("정렬결과", plan_meechul_groups(group_array))], last_col
+
+def plan_excel_general(file_path, 기준코드, engine='python', progress=None):
+    """일반 정렬 계획 (P1, P2 등): (헤더 2행, [(시트명, 정렬 계획)], 열 수)"""
+    logger.info(f"{기준코드} 처리 시작: {file_path} (엔진: {engine})")
+    
+    header_rows, data_rows, last_col = load_meechul_rows(file_path, progress)
+    last_row = len(header_rows) + len(data_rows)
+    
+    logger.info(f"Excel 파일 크기: {last_row}행 x {last_col}열")
+
+    if engine == 'pandas':
+        plan = plan_meechul_groups_pandas(meechul_frame(data_rows), data_rows, 기준코드)
+        logger.info(f"정렬된 그룹 수: {len(plan)}")
+        return header_rows, [("정렬결과", plan)], last_col
+
+    group_dict = {}
+    for row in data_rows:
+        code = str(row[14])
+        if code.startswith(기준코드):
+            key = str(row[1])
+            group_dict.setdefault(key, []).append(row)
+
+    logger.info(f"{기준코드} 항목 수: {len(group_dict)}")
+
+    group_array = sort_meechul_groups(group_dict)
+    
+    logger.info(f"정렬된 그룹 수: {len(group_array)}")
+
+    return header_rows, [("정렬결과", plan_meechul_groups(group_array))], last_col
+
+def plan_excel_all(file_path, engine='python', progress=None):
+    """P1, P2, P3 정렬을 한 번의 파싱으로 계획: (헤더 2행, 시트 3개의 [(시트명, 정렬 계획)], 열 수)"""
+    logger.info(f"P1/P2/P3 통합 처리 시작: {file_path} (엔진: {engine})")
+
+    header_rows, data_rows, last_col = load_meechul_rows(file_path, progress)
+    last_row = len(header_rows) + len(data_rows)
+
+    logger.info(f"Excel 파일 크기: {last_row}행 x {last_col}열")
+
+    sheets = []
+    if engine == 'pandas':
+        df = meechul_frame(data_rows)
+        for 기준코드 in ('P1', 'P2', 'P3'):
+            sheets.append((f"정렬결과_{기준코드}", plan_meechul_groups_pandas(df, data_rows, 기준코드)))
+    else:
+        for 기준코드, group_dict in bucket_meechul_rows(data_rows).items():
+            group_array = sort_meechul_groups(group_dict)
+            sheets.append((f"정렬결과_{기준코드}", plan_meechul_groups(group_array)))
+
+    for title, plan in sheets:
+        logger.info(f"{title} 정렬된 그룹 수: {len(plan)}")
+
+    return header_rows, sheets, last_col
+
+def process_excel_p3(file_path, engine='python', progress=None):
+    """P3 정렬 처리 (중복 제거 포함)"""
+    return build_meechul_workbook(*plan_excel_p3(file_path, engine, progress), progress)
+
+def process_excel_general(file_path, 기준코드, engine='python', progress=None):
+    """일반 정렬 처리 (P1, P2 등)"""
+    return build_meechul_workbook(*plan_excel_general(file_path, 기준코드, engine, progress), progress)
+
+def process_excel_all(file_path, engine='python', progress=None):
+    """P1, P2, P3 정렬을 한 번의 파싱으로 처리해 시트 3개짜리 통합 결과를 생성"""
+    return build_meechul_workbook(*plan_excel_all(file_path, engine, progress), progress)
+
+# 변경분 모드: 기준코드별 직전 실행의 그룹 지문(B열 키 → 그룹 행 해시)과 비교해 신규/변경/해결 그룹만 출력
+MEECHUL_DIFF_STATUS_HEADER = '변경구분'
+
+def meechul_group_fingerprint(rows):
+    """그룹 행 전체 값의 8바이트 해시 (같은 B열 키 그룹의 내용이 바뀌었는지 비교용)"""
+    return hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+
+def meechul_sheet_criteria(title, 기준코드):
+    """결과 시트의 기준코드 (ALL의 '정렬결과_P1' 시트는 P1, 단일 기준은 요청한 기준코드)"""
+    return title.rsplit('_', 1)[1] if 기준코드 == 'ALL' else 기준코드
+
+def diff_meechul_plan(plan, previous, last_col):
+    """정렬 계획을 직전 지문과 비교해 (신규/변경 그룹 계획, 해결된 키 목록, 새 지문, 건수)를 반환
+
+    신규/변경 그룹의 행 끝(last_col 다음 열)에 변경 구분을 붙이고, 변경 없는 그룹은 제외한다.
+    previous가 None이면(해당 기준코드의 직전 실행 없음) 모든 그룹을 신규로 본다.
+    """
+    previous = previous or {}
+    index = {}
+    changed_plan = []
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+
+    for rows, m_high, n_high, m_merge, n_merge in plan:
+        key = str(rows[0][1])
+        fingerprint = meechul_group_fingerprint(rows)
+        index[key] = fingerprint
+
+        old = previous.get(key)
+        if old == fingerprint:
+            counts['unchanged'] += 1
+            continue
+
+        status = '신규' if old is None else '변경'
+        counts['new' if old is None else 'changed'] += 1
+        changed_plan.append(([row[:last_col] + (status,) for row in rows], m_high, n_high, m_merge, n_merge))
+
+    resolved = [key for key in previous if key not in index]
+    counts['resolved'] = len(resolved)
+    return changed_plan, resolved, index, counts
+
+# 미출대응 파일 타입별 (정렬 기준 열 이름에 포함된 코드, 해당 열이 없을 때 정렬할 열 번호, 위치 표시)
+MISSING_RESPONSE_TYPES = {
+    'b-building': (None, 0, 'B동'),
+    'a-ground': ('P2', 1, 'A동지상(P2)'),
+    'a-basement': ('P1', 0, 'A동지하(P1)')
+}
+
+def find_missing_response_sort_column(df, keyword, fallback_index):
+    """열 이름에 keyword(P1/P2)가 포함된 첫 열, 없으면 fallback_index번째 열(없으면 첫 열)을 정렬 기준으로 반환"""
+    if keyword:
+        for col in df.columns:
+            if keyword in str(col):
+                return col
+    return df.columns[fallback_index] if len(df.columns) > fallback_index else df.columns[0]
+
+def build_missing_response_result(df, file_type, timings=None):
+    """B동/A동지상/A동지하 공통 처리: 기준 열로 정렬 후 앞 3개 열을 열 단위로 문자열 변환해 레코드 목록 생성"""
+    keyword, fallback_index, location = MISSING_RESPONSE_TYPES[file_type]
+    timings = timings if timings is not None else {}
+    try:
+        start = time.perf_counter()
+        df_sorted = df.sort_values(find_missing_response_sort_column(df, keyword, fallback_index))
+        timings['sort'] = round(time.perf_counter() - start, 3)
+
+        # 앞 3개 열(상품코드/상품명/수량)만 열 단위로 문자열 변환 (str(None) == 'None', 없는 열은 빈 문자열)
+        start = time.perf_counter()
+        columns = [
+            df_sorted.iloc[:, idx].map(str).tolist() if idx < len(df_sorted.columns) else [''] * len(df_sorted)
+            for idx in range(3)
+        ]
+        timings['convert'] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        result = [
+            {'productCode': code, 'productName': name, 'quantity': quantity, 'location': location}
+            for code, name, quantity in zip(*columns)
+        ]
+        timings['serialize'] = round(time.perf_counter() - start, 3)
+        return result
+    except Exception as e:
+        logger.error(f"{location} 데이터 처리 에러: {e}")
+        return []
+
+class ExcelReadError(Exception):
+    """업로드된 엑셀 파일을 읽지 못한 경우"""
+
+# 더 빠른 엑셀 리더(python-calamine)가 설치되어 있으면 사용 (없으면 pandas 기본 openpyxl)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+def read_upload_frame(file_path, usecols=None, dtype=None, nrows=None):
+    """업로드 파일(임시 파일 경로 또는 bytes)을 형식(내용으로 판별)에 맞는 pandas 리더로 읽어 DataFrame 반환
+
+    usecols는 열 위치 목록, dtype은 열 이름별 타입 (parquet은 이미 타입이 있으므로 dtype 미적용)
+    """
+    file_format = detect_upload_format(file_path)
+    with open_upload(file_path) as f:
+        if file_format == 'csv':
+            encoding = detect_csv_encoding(f.read(UPLOAD_SNIFF_BYTES))
+            f.seek(0)
+            # 빈 행도 read_excel과 같이 데이터 행으로 유지
+            return pd.read_csv(f, encoding=encoding, skip_blank_lines=False,
+                               usecols=usecols, dtype=dtype, nrows=nrows)
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            names = [name for name in pq.read_schema(f).names if not name.startswith('__index_level_')]
+            columns = names if usecols is None else [names[idx] for idx in usecols]
+            if nrows == 0:
+                return pd.DataFrame(columns=columns)
+            f.seek(0)
+            return pd.read_parquet(f, columns=columns)
+        return pd.read_excel(f, engine=EXCEL_READ_ENGINE, usecols=usecols, dtype=dtype, nrows=nrows)
+
+def read_missing_response_frame(file_path, file_type):
+    """헤더만 먼저 읽어 필요한 열(앞 3개 + 정렬 기준 열)을 정하고, 그 열만 타입을 지정해 읽음
+
+    결과로 문자열만 쓰는 앞 3개 열은 str로 읽고, 정렬 기준 열은 정렬 순서가 바뀌지 않도록 추론된 타입을 유지
+    """
+    header = read_upload_frame(file_path, nrows=0)
+    if len(header.columns) == 0:
+        return header
+
+    keyword, fallback_index, _ = MISSING_RESPONSE_TYPES[file_type]
+    names = list(header.columns)
+    sort_column = find_missing_response_sort_column(header, keyword, fallback_index)
+    sort_idx = names.index(sort_column)
+
+    usecols = sorted({idx for idx in range(min(3, len(names)))} | {sort_idx})
+    dtype = {names[idx]: str for idx in usecols if idx < 3 and idx != sort_idx}
+    return read_upload_frame(file_path, usecols=usecols, dtype=dtype)
+
+def sort_missing_response(file_path, file_type, progress=None):
+    """엑셀 파일을 읽어 (타입별 정렬 결과 목록, 단계별 처리 시간)을 반환 (프로세스 풀 워커에서 실행)"""
+    timings = {}
+    
+    # 엑셀 파일 읽기
+    try:
+        start = time.perf_counter()
+        df = read_missing_response_frame(file_path, file_type)
+        timings['read'] = round(time.perf_counter() - start, 3)
+        logger.info(f"엑셀 파일 읽기 성공: {len(df)} 행")
+    except Exception as e:
+        logger.error(f"엑셀 파일 읽기 실패: {e}")
+        raise ExcelReadError(f'엑셀 파일 읽기에 실패했습니다: {str(e)}')
+    
+    if progress is not None:
+        progress['rows_read'] = len(df)
+    
+    result = build_missing_response_result(df, file_type, timings)
+    logger.info(f"미출대응 단계별 처리 시간(초): {timings}")
+    
+    if progress is not None:
+        progress['rows_written'] = len(result)
+    
+    return result, timings
+
+# 미출대응 정렬 결과 파일: 첫 줄은 메타 정보(소유자, 항목 수), 이후 한 줄에 한 항목(NDJSON)
+# 같은 이름 + '.idx' 파일에 항목별 시작 위치(8바이트, 마지막은 파일 끝)를 저장해 cursor 위치를 앞에서부터 읽지 않고 찾음
+def save_missing_response_result(rows, owner_id, path):
+    """정렬 결과 목록을 결과 파일과 위치 색인 파일로 저장 (색인을 먼저 옮겨 결과 파일이 보이면 색인도 있음)"""
+    meta = json.dumps({'owner': owner_id, 'total': len(rows)}).encode() + b'\n'
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    lines = [(encode(item) + '\n').encode() for item in rows]
+    offsets = array('Q', accumulate(map(len, lines), initial=len(meta)))
+
+    partial_path = f"{path}.{uuid.uuid4().hex}.part"
+    with open(partial_path, 'wb') as f:
+        f.write(meta)
+        f.writelines(lines)
+    with open(f"{partial_path}.idx", 'wb') as f:
+        offsets.tofile(f)
+    os.replace(f"{partial_path}.idx", f"{path}.idx")
+    os.replace(partial_path, path)
+
+def read_missing_response_meta(path):
+    """결과 파일의 메타 정보 {'owner', 'total'} (파일이 없으면 FileNotFoundError)"""
+    with open(path, 'rb') as f:
+        return json.loads(f.readline())
+
+def missing_response_offset(path, cursor):
+    """cursor번째 항목의 결과 파일 내 시작 위치 (cursor가 항목 수 이상이면 파일 끝)"""
+    with open(f"{path}.idx", 'rb') as f:
+        count = os.fstat(f.fileno()).st_size // 8
+        f.seek(min(cursor, count - 1) * 8)
+        return array('Q', f.read(8))[0]
+
+def read_missing_response_page(path, cursor, limit):
+    """결과 파일에서 cursor번째 항목부터 최대 limit개 항목 목록"""
+    start = missing_response_offset(path, cursor)
+    end = missing_response_offset(path, cursor + limit)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return [json.loads(line) for line in f.read(end - start).splitlines()]
+
+def sort_missing_response_to_file(file_path, file_type, owner_id, output_path, page_size, progress=None):
+    """정렬 결과를 결과 파일로 저장하고 (항목 수, 첫 페이지, 단계별 처리 시간)만 반환 (프로세스 풀 워커에서 실행)
+
+    전체 결과를 요청 프로세스로 돌려보내거나 메모리에 보관하지 않고, 이후 페이지/스트림은 결과 파일에서 읽는다.
+    """
+    result, timings = sort_missing_response(file_path, file_type, progress)
+    start = time.perf_counter()
+    save_missing_response_result(result, owner_id, output_path)
+    timings['save'] = round(time.perf_counter() - start, 3)
+    return len(result), result[:page_size], timings
+
+def sort_meechul_to_file(file_path, 기준코드, engine, output_path, progress=None):
+    """미출대응 정렬 결과를 output_path에 저장 (프로세스 풀 워커에서 실행)"""
+    processed_wb = process_meechul_file(file_path, 기준코드, engine, progress)
+    # 같은 파일을 동시에 처리하는 작업과 겹쳐 쓰지 않도록 임시 이름으로 저장 후 교체
+    partial_path = f"{output_path}.{uuid.uuid4().hex}.part"
+    processed_wb.save(partial_path)
+    os.replace(partial_path, output_path)
+
+def sort_meechul_diff_to_file(file_path, 기준코드, engine, output_path, previous, progress=None):
+    """직전 실행 지문(기준코드 → 지문)과 비교해 변경분만 output_path에 저장하고 (새 지문, 건수)를 반환 (프로세스 풀 워커에서 실행)
+
+    기준코드별 정렬 시트에는 신규/변경 그룹만 같은 서식으로 기록하고, 해결된(이번에 없어진) B열 키는 '해결_기준코드' 시트에 나열
+    """
+    header_rows, sheets, last_col = plan_meechul_file(file_path, 기준코드, engine, progress)
+    diff_header_rows = [header_rows[0][:last_col] + (MEECHUL_DIFF_STATUS_HEADER,), header_rows[1][:last_col] + (None,)]
+
+    diff_sheets = []
+    resolved_sheets = []
+    indexes = {}
+    summary = {}
+    for title, plan in sheets:
+        code = meechul_sheet_criteria(title, 기준코드)
+        changed_plan, resolved, indexes[code], summary[code] = diff_meechul_plan(plan, previous.get(code), last_col)
+        diff_sheets.append((title, changed_plan))
+        resolved_sheets.append((f"해결_{code}", resolved))
+
+    processed_wb = build_meechul_workbook(diff_header_rows, diff_sheets, last_col + 1, progress)
+    for title, keys in resolved_sheets:
+        resolved_ws = processed_wb.create_sheet(title)
+        resolved_ws.append([header_rows[0][1] or '상품코드'])
+        for key in keys:
+            resolved_ws.append([key])
+
+    partial_path = f"{output_path}.{uuid.uuid4().hex}.part"
+    processed_wb.save(partial_path)
+    os.replace(partial_path, output_path)
+    return indexes, summary
+
+def plan_meechul_file(file_path, 기준코드, engine='python', progress=None):
+    """기준코드에 맞는 정렬 엔진으로 미출대응 파일의 (헤더 2행, [(시트명, 정렬 계획)], 열 수)를 계산"""
+    if 기준코드 == 'ALL':
+        return plan_excel_all(file_path, engine, progress)
+    if 기준코드 == 'P3':
+        return plan_excel_p3(file_path, engine, progress)
+    return plan_excel_general(file_path, 기준코드, engine, progress)
+
+def process_meechul_file(file_path, 기준코드, engine='python', progress=None):
+    """기준코드에 맞는 정렬 엔진으로 미출대응 Excel을 처리해 결과 통합 문서를 반환"""
+    return build_meechul_workbook(*plan_meechul_file(file_path, 기준코드, engine, progress), progress)
+
+MISSING_RESPONSE_SHEET_HEADERS = ['순번', '상품코드', '상품명', '수량', '위치']
+
+def write_missing_response_workbook(sheets, output_path, progress=None):
+    """(시트 이름, 정렬 결과 파일 경로) 목록을 시트별로 나눠 xlsx로 저장 (프로세스 풀 워커에서 실행)
+
+    결과 파일을 한 줄씩 읽어 쓰므로 전체 결과를 메모리에 올리지 않는다.
+    결과 파일이 없거나 항목 수/크기가 색인과 다르면 빈(또는 잘린) 시트를 쓰기 전에 FileNotFoundError/ValueError를 낸다.
+    """
+    for title, path in sheets:
+        with open(f"{path}.idx", 'rb') as f:
+            offsets = array('Q', f.read())
+        total = read_missing_response_meta(path)['total']
+        if len(offsets) != total + 1 or os.path.getsize(path) != offsets[-1]:
+            raise ValueError(f"{title} 정렬 결과 파일이 손상되었습니다.")
+    
+    wb = openpyxl.Workbook(write_only=True)
+    for title, path in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(MISSING_RESPONSE_SHEET_HEADERS)
+        with open(path, 'rb') as f:
+            f.readline()  # 메타 정보
+            for number, line in enumerate(f, 1):
+                item = json.loads(line)
+                ws.append([number, item['productCode'], item['productName'], item['quantity'], item['location']])
+    
+    partial_path = f"{output_path}.{uuid.uuid4().hex}.part"
+    wb.save(partial_path)
+    os.replace(partial_path, output_path)
+
+def init_excel_process(max_memory_mb=0):
+    """프로세스 풀 워커 초기화: 로그 형식을 앱과 맞추고 워커별 메모리(데이터 영역) 상한 설정"""
+    logging.basicConfig(level=logging.INFO)
+    if max_memory_mb > 0:
+        import resource
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+def run_excel_task(func, args, progress, timeout=0):
+    """프로세스 풀 워커에서 작업별 시간 제한(초, 0이면 없음)을 걸고 처리 함수를 실행"""
+    if timeout > 0:
+        def excel_task_timeout(signum, frame):
+            raise TimeoutError(f'처리 시간이 제한({timeout}초)을 초과했습니다.')
+        signal.signal(signal.SIGALRM, excel_task_timeout)
+        signal.alarm(timeout)
+    try:
+        return func(*args, progress=progress)
+    finally:
+        if timeout > 0:
+            signal.alarm(0)
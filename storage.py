@@ -0,0 +1,594 @@
+"""
+WorkTracker 저장소 계층 (storage.py)
+users, departments, work_logs 테이블 작업을 Repository 인터페이스로 모아
+Supabase(PostgREST HTTP API), Postgres 직접 연결(연결 풀), 로컬 SQLite 중 하나로 처리
+"""
+
+import os
+import uuid
+import sqlite3
+import logging
+import threading
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# Postgres 직접 연결용 드라이버(psycopg 3, psycopg_pool)가 없으면 Supabase/SQLite 저장소만 사용 가능
+try:
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+DATABASE_BACKENDS = ('supabase', 'postgres', 'sqlite')
+
+# 초기화 시 생성하는 기본 소속과 관리자 계정
+DEFAULT_DEPARTMENTS = ('B동보충', 'A지상보충', 'A지하보충')
+DEFAULT_ADMIN = {'username': 'admin', 'password_hash': '0000', 'role': 'admin'}
+
+# 세션 프로필에 쓰는 사용자 열 (소속 이름 포함)
+PROFILE_COLUMNS = 'id, username, role, department_id, created_at, departments(name)'
+
+class Repository:
+    """앱과 init_db.py가 사용하는 테이블 작업 모음 (저장소별 구현은 아래 클래스)
+
+    행은 PostgREST 응답과 같은 JSON 형태의 dict로 반환하고, 관계 테이블은
+    users(..., departments(name))처럼 중첩 dict(없으면 None)로 넣는다.
+    """
+
+    # 사용자
+    def get_user_role(self, user_id):
+        """사용자 역할 (없는 사용자는 None)"""
+        raise NotImplementedError
+
+    def get_user(self, user_id):
+        """PROFILE_COLUMNS 형태의 사용자 1명 (없으면 None)"""
+        raise NotImplementedError
+
+    def get_user_by_username(self, username):
+        """사용자명으로 PROFILE_COLUMNS 형태의 사용자 1명 조회 (없으면 None)"""
+        raise NotImplementedError
+
+    def list_users(self):
+        """전체 사용자 (모든 열 + departments(name))"""
+        raise NotImplementedError
+
+    def insert_user(self, user_data):
+        """사용자 등록 후 저장된 행 반환 (실패 시 None)"""
+        raise NotImplementedError
+
+    def update_user(self, user_id, fields):
+        """사용자 수정 후 수정된 행 반환 (없으면 None)"""
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        """사용자 삭제 (삭제된 행이 있으면 True, 업무 로그는 함께 삭제)"""
+        raise NotImplementedError
+
+    # 소속
+    def list_departments(self, newest_first=False):
+        """전체 소속 (newest_first면 생성일 최신순)"""
+        raise NotImplementedError
+
+    def insert_department(self, department_data):
+        """소속 생성 후 저장된 행 반환 (실패 시 None)"""
+        raise NotImplementedError
+
+    def update_department(self, dept_id, fields):
+        """소속 수정 후 수정된 행 반환 (없으면 None)"""
+        raise NotImplementedError
+
+    def delete_department(self, dept_id):
+        """소속 삭제 (삭제된 행이 있으면 True)"""
+        raise NotImplementedError
+
+    # 업무
+    def list_user_tasks(self, user_id, start_date, end_date, columns=None, status=None, after=None, limit=None):
+        """사용자의 기간 내 업무 목록 (최신순, status가 있으면 그 상태만)
+
+        columns가 있으면 그 열만(커서용 created_at, id 포함), after/limit은 list_admin_tasks와 같은 keyset 페이지
+        """
+        raise NotImplementedError
+
+    def get_task(self, task_id, user_id=None):
+        """업무 1건 조회 (user_id가 있으면 그 사용자의 업무만, 없으면 None)"""
+        raise NotImplementedError
+
+    def insert_task(self, task_data):
+        """업무 등록 후 저장된 행 반환 (실패 시 None)"""
+        raise NotImplementedError
+
+    def update_task(self, task_id, update_data, user_id=None):
+        """업무 수정 후 수정된 행 반환 (user_id가 있으면 그 사용자의 업무만, 없거나 권한이 없으면 None)
+
+        소유자 확인과 수정을 한 문장으로 처리하므로 따로 조회할 필요가 없음
+        """
+        raise NotImplementedError
+
+    def delete_task(self, task_id, user_id=None):
+        """업무 삭제 (user_id가 있으면 그 사용자의 업무만, 삭제된 행이 있으면 True)"""
+        raise NotImplementedError
+
+    def list_admin_tasks(self, start_date=None, end_date=None, department=None, task_type=None, status=None,
+                         after=None, limit=None):
+        """관리자용 업무 목록 (작성자 이름/소속 포함, 최신순, 날짜가 없으면 그쪽 기간 제한 없음)
+
+        after가 (created_at, id)이면 그 행 다음부터(keyset), limit이 있으면 최대 limit개
+        """
+        raise NotImplementedError
+
+    def task_statistics(self, work_date):
+        """총 작업자 수와 해당 날짜의 참여자 수, 완료/진행중/전체 업무 수"""
+        raise NotImplementedError
+
+    # 초기화
+    def reset_data(self):
+        """업무 로그, admin 외 사용자, 소속을 모두 삭제하고 테이블별 삭제 행 수 반환"""
+        raise NotImplementedError
+
+    def seed_defaults(self):
+        """기본 소속과 (없으면) admin 계정 생성, 생성한 소속 수와 admin 생성 여부 반환"""
+        for name in DEFAULT_DEPARTMENTS:
+            self.insert_department({'name': name})
+
+        admin_created = self.get_user_by_username(DEFAULT_ADMIN['username']) is None
+        if admin_created:
+            self.insert_user(dict(DEFAULT_ADMIN))
+        return {'departments_created': len(DEFAULT_DEPARTMENTS), 'admin_created': admin_created}
+
+class SupabaseRepository(Repository):
+    """Supabase(PostgREST) HTTP API로 테이블을 읽고 쓰는 저장소"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def first(result):
+        return result.data[0] if result.data else None
+
+    def get_user_role(self, user_id):
+        user = self.first(self.client.table('users').select('role').eq('id', user_id).execute())
+        return user['role'] if user else None
+
+    def get_user(self, user_id):
+        return self.first(self.client.table('users').select(PROFILE_COLUMNS).eq('id', user_id).execute())
+
+    def get_user_by_username(self, username):
+        return self.first(self.client.table('users').select(PROFILE_COLUMNS).eq('username', username).execute())
+
+    def list_users(self):
+        return self.client.table('users').select('*, departments(name)').execute().data
+
+    def insert_user(self, user_data):
+        return self.first(self.client.table('users').insert(user_data).execute())
+
+    def update_user(self, user_id, fields):
+        return self.first(self.client.table('users').update(fields).eq('id', user_id).execute())
+
+    def delete_user(self, user_id):
+        return bool(self.client.table('users').delete().eq('id', user_id).execute().data)
+
+    def list_departments(self, newest_first=False):
+        query = self.client.table('departments').select('*')
+        if newest_first:
+            query = query.order('created_at', desc=True)
+        return query.execute().data
+
+    def insert_department(self, department_data):
+        return self.first(self.client.table('departments').insert(department_data).execute())
+
+    def update_department(self, dept_id, fields):
+        return self.first(self.client.table('departments').update(fields).eq('id', dept_id).execute())
+
+    def delete_department(self, dept_id):
+        return bool(self.client.table('departments').delete().eq('id', dept_id).execute().data)
+
+    def list_user_tasks(self, user_id, start_date, end_date, columns=None, status=None, after=None, limit=None):
+        query = self.client.table('work_logs').select(','.join(columns) if columns else '*').eq('user_id', user_id)
+        if start_date == end_date:
+            query = query.eq('work_date', start_date)
+        else:
+            query = query.gte('work_date', start_date).lte('work_date', end_date)
+        if status:
+            query = query.eq('status', status)
+        if after:
+            created_at, task_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{int(task_id)})')
+        query = query.order('created_at', desc=True).order('id', desc=True)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    def get_task(self, task_id, user_id=None):
+        query = self.client.table('work_logs').select('*').eq('id', task_id)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        return self.first(query.execute())
+
+    def insert_task(self, task_data):
+        return self.first(self.client.table('work_logs').insert(task_data).execute())
+
+    def update_task(self, task_id, update_data, user_id=None):
+        query = self.client.table('work_logs').update(update_data).eq('id', task_id)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        return self.first(query.execute())
+
+    def delete_task(self, task_id, user_id=None):
+        query = self.client.table('work_logs').delete().eq('id', task_id)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        return bool(query.execute().data)
+
+    def list_admin_tasks(self, start_date=None, end_date=None, department=None, task_type=None, status=None,
+                         after=None, limit=None):
+        # 소속 필터는 inner 조인이어야 다른 소속 업무가 (users가 빈 채로) 섞이지 않음
+        if department:
+            query = self.client.table('work_logs').select('*, users!inner(username, departments!inner(name))')
+            query = query.eq('users.departments.name', department)
+        else:
+            query = self.client.table('work_logs').select('*, users(username, departments(name))')
+        if start_date:
+            query = query.gte('work_date', start_date)
+        if end_date:
+            query = query.lte('work_date', end_date)
+        if task_type:
+            query = query.eq('task_type', task_type)
+        if status:
+            query = query.eq('status', status)
+        if after:
+            created_at, task_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{int(task_id)})')
+        query = query.order('created_at', desc=True).order('id', desc=True)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    def task_statistics(self, work_date):
+        total_users = self.client.table('users').select('id').execute()
+        today_tasks = self.client.table('work_logs').select('user_id, status').eq('work_date', work_date).execute()
+        return {
+            'total_workers': len(total_users.data),
+            'today_participants': len(set(task['user_id'] for task in today_tasks.data)),
+            'completed_tasks': len([task for task in today_tasks.data if task['status'] == '완료']),
+            'ongoing_tasks': len([task for task in today_tasks.data if task['status'] == '진행중']),
+            'total_tasks': len(today_tasks.data)
+        }
+
+    def reset_data(self):
+        # PostgREST는 조건 없는 삭제를 막으므로 항상 참인 조건을 붙임
+        return {
+            'work_logs': len(self.client.table('work_logs').delete().neq('id', 0).execute().data or []),
+            'users': len(self.client.table('users').delete().neq('username', 'admin').execute().data or []),
+            'departments': len(self.client.table('departments').delete().neq('id', 0).execute().data or [])
+        }
+
+def nest_department(row, column='department_name'):
+    """조인으로 받은 소속 이름 열을 PostgREST의 departments(name) 중첩 형태로 변환"""
+    name = row.pop(column)
+    row['departments'] = {'name': name} if name is not None else None
+    return row
+
+class SqlRepository(Repository):
+    """SQL로 테이블을 직접 읽고 쓰는 저장소 공통 구현 (Postgres/SQLite가 같은 SQL 사용, 자리표시자는 %s)"""
+
+    def fetch_all(self, query, params=()):
+        """SQL 1회 실행 결과 행 목록 (JSON 형태 dict)"""
+        raise NotImplementedError
+
+    def fetch_one(self, query, params=()):
+        rows = self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    # 열 이름은 라우트에서 정한 고정 키만 사용
+    def insert(self, table, data):
+        columns = ', '.join(data)
+        placeholders = ', '.join(['%s'] * len(data))
+        return self.fetch_one(f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) RETURNING *",
+                              tuple(data.values()))
+
+    def update(self, table, row_id, fields, user_id=None):
+        assignments = ', '.join(f"{column} = %s" for column in fields)
+        where, params = self.row_condition(row_id, user_id)
+        return self.fetch_one(f"UPDATE {table} SET {assignments} WHERE {where} RETURNING *",
+                              (*fields.values(), *params))
+
+    def delete(self, table, row_id, user_id=None):
+        where, params = self.row_condition(row_id, user_id)
+        return self.fetch_one(f"DELETE FROM {table} WHERE {where} RETURNING id", params) is not None
+
+    @staticmethod
+    def row_condition(row_id, user_id=None):
+        """id 조건 (user_id가 있으면 소유자 조건 추가)"""
+        if user_id is None:
+            return "id = %s", (row_id,)
+        return "id = %s AND user_id = %s", (row_id, user_id)
+
+    def get_user_role(self, user_id):
+        user = self.fetch_one("SELECT role FROM users WHERE id = %s", (user_id,))
+        return user['role'] if user else None
+
+    def get_user(self, user_id):
+        return self.find_profile("u.id = %s", user_id)
+
+    def get_user_by_username(self, username):
+        return self.find_profile("u.username = %s", username)
+
+    def find_profile(self, condition, value):
+        user = self.fetch_one(
+            "SELECT u.id, u.username, u.role, u.department_id, u.created_at, d.name AS department_name "
+            f"FROM users u LEFT JOIN departments d ON d.id = u.department_id WHERE {condition}",
+            (value,))
+        return nest_department(user) if user else None
+
+    def list_users(self):
+        rows = self.fetch_all(
+            "SELECT u.*, d.name AS department_name FROM users u LEFT JOIN departments d ON d.id = u.department_id")
+        return [nest_department(row) for row in rows]
+
+    def insert_user(self, user_data):
+        # users.id 기본값(gen_random_uuid)이 없는 SQLite와 맞추기 위해 ID를 앱에서 생성
+        return self.insert('users', {'id': str(uuid.uuid4()), **user_data})
+
+    def update_user(self, user_id, fields):
+        return self.update('users', user_id, fields)
+
+    def delete_user(self, user_id):
+        return self.delete('users', user_id)
+
+    def list_departments(self, newest_first=False):
+        order = " ORDER BY created_at DESC" if newest_first else ''
+        return self.fetch_all(f"SELECT * FROM departments{order}")
+
+    def insert_department(self, department_data):
+        return self.insert('departments', department_data)
+
+    def update_department(self, dept_id, fields):
+        return self.update('departments', dept_id, fields)
+
+    def delete_department(self, dept_id):
+        return self.delete('departments', dept_id)
+
+    def list_user_tasks(self, user_id, start_date, end_date, columns=None, status=None, after=None, limit=None):
+        params = [user_id, start_date, end_date]
+        conditions = ''
+        if status:
+            conditions += " AND status = %s"
+            params.append(status)
+        if after:
+            conditions += " AND (created_at, id) < (%s, %s)"
+            params.extend(after)
+        if limit:
+            params.append(limit)
+        return self.fetch_all(
+            f"SELECT {', '.join(columns) if columns else '*'} FROM work_logs "
+            f"WHERE user_id = %s AND work_date BETWEEN %s AND %s{conditions} "
+            "ORDER BY created_at DESC, id DESC" + (" LIMIT %s" if limit else ''),
+            params)
+
+    def get_task(self, task_id, user_id=None):
+        if user_id is None:
+            return self.fetch_one("SELECT * FROM work_logs WHERE id = %s", (task_id,))
+        return self.fetch_one("SELECT * FROM work_logs WHERE id = %s AND user_id = %s", (task_id, user_id))
+
+    def insert_task(self, task_data):
+        return self.insert('work_logs', task_data)
+
+    def update_task(self, task_id, update_data, user_id=None):
+        return self.update('work_logs', task_id, update_data, user_id)
+
+    def delete_task(self, task_id, user_id=None):
+        return self.delete('work_logs', task_id, user_id)
+
+    def list_admin_tasks(self, start_date=None, end_date=None, department=None, task_type=None, status=None,
+                         after=None, limit=None):
+        conditions = []
+        params = []
+        for condition, value in (("w.work_date >= %s", start_date), ("w.work_date <= %s", end_date),
+                                 ("d.name = %s", department), ("w.task_type = %s", task_type),
+                                 ("w.status = %s", status)):
+            if value:
+                conditions.append(condition)
+                params.append(value)
+        if after:
+            conditions.append("(w.created_at, w.id) < (%s, %s)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if limit:
+            params.append(limit)
+        rows = self.fetch_all(
+            "SELECT w.*, u.username AS user_username, d.name AS user_department "
+            "FROM work_logs w LEFT JOIN users u ON u.id = w.user_id "
+            f"LEFT JOIN departments d ON d.id = u.department_id {where} "
+            "ORDER BY w.created_at DESC, w.id DESC" + (" LIMIT %s" if limit else ''),
+            params)
+
+        # PostgREST의 users(username, departments(name)) 중첩 형태로 변환
+        for row in rows:
+            username = row.pop('user_username')
+            department_name = row.pop('user_department')
+            row['users'] = {
+                'username': username,
+                'departments': {'name': department_name} if department_name is not None else None
+            } if username is not None else None
+        return rows
+
+    def task_statistics(self, work_date):
+        return self.fetch_one(
+            "SELECT (SELECT count(*) FROM users) AS total_workers, "
+            "count(DISTINCT user_id) AS today_participants, "
+            "count(*) FILTER (WHERE status = '완료') AS completed_tasks, "
+            "count(*) FILTER (WHERE status = '진행중') AS ongoing_tasks, "
+            "count(*) AS total_tasks "
+            "FROM work_logs WHERE work_date = %s",
+            (work_date,))
+
+    def reset_data(self):
+        return {
+            'work_logs': len(self.fetch_all("DELETE FROM work_logs RETURNING id")),
+            'users': len(self.fetch_all("DELETE FROM users WHERE username <> 'admin' RETURNING id")),
+            'departments': len(self.fetch_all("DELETE FROM departments RETURNING id"))
+        }
+
+def serialize_db_row(row):
+    """드라이버가 돌려준 값(date/time/timestamp, numeric, uuid)을 PostgREST 응답과 같은 JSON 값으로 변환"""
+    for key, value in row.items():
+        if hasattr(value, 'isoformat'):
+            row[key] = value.isoformat()
+        elif isinstance(value, Decimal):
+            row[key] = float(value)
+        elif isinstance(value, uuid.UUID):
+            row[key] = str(value)
+    return row
+
+class PostgresRepository(SqlRepository):
+    """psycopg 연결 풀로 Postgres에 직접 연결하는 저장소 (요청마다 HTTP 왕복 대신 풀의 연결로 SQL 1회)
+
+    DATABASE_URL은 Supabase의 직접 연결 또는 세션 모드 풀러 주소를 사용
+    (트랜잭션 모드 풀러는 psycopg가 자동으로 만드는 prepared statement를 지원하지 않음)
+    """
+
+    def __init__(self, conninfo, pool_min=1, pool_max=10, timeout=10.0):
+        # 풀 연결 스레드는 gunicorn fork 이후 첫 요청에서 시작
+        self.pool = ConnectionPool(conninfo, min_size=pool_min, max_size=pool_max,
+                                   timeout=timeout, open=False, name='worktracker',
+                                   kwargs={'row_factory': dict_row, 'autocommit': True})
+
+    def fetch_all(self, query, params=()):
+        self.pool.open()
+        with self.pool.connection() as conn:
+            return [serialize_db_row(row) for row in conn.execute(query, params).fetchall()]
+
+# supabase/complete_reset.sql과 같은 테이블/제약/인덱스 (시간은 KST ISO 문자열로 저장)
+KST_NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f+09:00', 'now', '+9 hours'))"
+SQLITE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT DEFAULT {KST_NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT,
+    role TEXT DEFAULT 'user' CHECK (role IN ('user', 'admin')),
+    department_id INTEGER REFERENCES departments(id),
+    created_at TEXT DEFAULT {KST_NOW_SQL},
+    updated_at TEXT DEFAULT {KST_NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS work_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    department_id INTEGER REFERENCES departments(id),
+    work_date TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    task_type TEXT NOT NULL,
+    description TEXT,
+    complete_description TEXT,
+    status TEXT DEFAULT '진행중' CHECK (status IN ('진행중', '완료')),
+    work_hours REAL,
+    created_at TEXT DEFAULT {KST_NOW_SQL},
+    updated_at TEXT DEFAULT {KST_NOW_SQL}
+);
+
+-- updated_at을 직접 지정하지 않은 수정은 현재 시각(KST)으로 갱신
+CREATE TRIGGER IF NOT EXISTS update_users_updated_at
+    AFTER UPDATE ON users FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = {KST_NOW_SQL} WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_work_logs_updated_at
+    AFTER UPDATE ON work_logs FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE work_logs SET updated_at = {KST_NOW_SQL} WHERE id = NEW.id;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users(department_id);
+CREATE INDEX IF NOT EXISTS idx_work_logs_user_date ON work_logs(user_id, work_date);
+CREATE INDEX IF NOT EXISTS idx_work_logs_department ON work_logs(department_id);
+CREATE INDEX IF NOT EXISTS idx_work_logs_status ON work_logs(status);
+CREATE INDEX IF NOT EXISTS idx_work_logs_task_type ON work_logs(task_type);
+CREATE INDEX IF NOT EXISTS idx_work_logs_created ON work_logs(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_work_logs_user_created ON work_logs(user_id, created_at DESC, id DESC);
+"""
+
+class SqliteRepository(SqlRepository):
+    """로컬 SQLite 파일에 저장하는 저장소 (단일 인스턴스 현장/네트워크 없는 벤치마크용)
+
+    WAL 모드라 읽기와 쓰기가 서로 막지 않고, 연결은 스레드마다 하나씩 열어 재사용한다.
+    파일이 새로 만들어지면 complete_reset.sql과 같은 기본 소속/admin 계정을 넣는다.
+    """
+
+    # Postgres TIME 열처럼 'HH:MM' 입력을 'HH:MM:SS'로 저장
+    TIME_COLUMNS = ('start_time', 'end_time')
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+        conn = self.connection()
+        created = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone() is None
+        conn.executescript(SQLITE_SCHEMA)
+        if created:
+            self.seed_defaults()
+            logger.info(f"SQLite 데이터베이스 생성: {os.path.abspath(path)}")
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            self.local.conn = conn
+        return conn
+
+    def fetch_all(self, query, params=()):
+        rows = self.connection().execute(query.replace('%s', '?'), tuple(params)).fetchall()
+        return [dict(row) for row in rows]
+
+    def insert(self, table, data):
+        return super().insert(table, self.normalize_times(data))
+
+    def update(self, table, row_id, fields, user_id=None):
+        return super().update(table, row_id, self.normalize_times(fields), user_id)
+
+    def normalize_times(self, data):
+        return {column: f"{value}:00" if column in self.TIME_COLUMNS and isinstance(value, str) and len(value) == 5
+                else value
+                for column, value in data.items()}
+
+def create_repository(backend, supabase_client=None, database_url=None, sqlite_path=None,
+                      pool_min=1, pool_max=10, timeout=10.0):
+    """DATABASE_BACKEND 설정에 맞는 저장소 생성 (설정이 잘못되었거나 연결할 수 없으면 None)"""
+    if backend == 'supabase':
+        return SupabaseRepository(supabase_client) if supabase_client else None
+
+    if backend == 'postgres':
+        if ConnectionPool is None:
+            logger.error("❌ Postgres 직접 연결에 필요한 psycopg[pool] 패키지가 설치되지 않았습니다.")
+            return None
+        if not database_url:
+            logger.error("⚠️ DATABASE_BACKEND=postgres에는 DATABASE_URL이 필요합니다.")
+            return None
+        logger.info("✅ 저장소: Postgres 직접 연결")
+        return PostgresRepository(database_url, pool_min, pool_max, timeout)
+
+    if backend == 'sqlite':
+        try:
+            repository = SqliteRepository(sqlite_path, timeout)
+        except sqlite3.Error as e:
+            logger.error(f"❌ SQLite 데이터베이스 열기 실패: {e}")
+            return None
+        logger.info(f"✅ 저장소: SQLite ({sqlite_path})")
+        return repository
+
+    logger.error(f"⚠️ 지원하지 않는 DATABASE_BACKEND입니다: {backend} (가능: {', '.join(DATABASE_BACKENDS)})")
+    return None
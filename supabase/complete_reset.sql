@@ -112,6 +112,10 @@ CREATE INDEX idx_work_logs_user_date ON work_logs(user_id, work_date);
 CREATE INDEX idx_work_logs_department ON work_logs(department_id);
 CREATE INDEX idx_work_logs_status ON work_logs(status);
 CREATE INDEX idx_work_logs_task_type ON work_logs(task_type);
+-- 관리자 업무 목록 페이지 (created_at, id 기준 keyset 커서)
+CREATE INDEX idx_work_logs_created ON work_logs(created_at DESC, id DESC);
+-- 작업자 업무 이력 페이지 (사용자별 created_at, id 기준 keyset 커서)
+CREATE INDEX idx_work_logs_user_created ON work_logs(user_id, created_at DESC, id DESC);
 
 -- ========================================
 -- 6단계: RLS (Row Level Security) 설정